@@ -0,0 +1,190 @@
+
+from datetime import date
+
+import numpy as np
+
+from categorizer import normalize_tokens
+from sheet_model import DatePartitionedModel
+
+# Payment rails and bank shorthand that lead most descriptions
+# ("UPI/SWIGGY/...", "NEFT-ACME LTD-..."); the merchant is the first word
+# after them.
+CHANNEL_WORDS = frozenset({
+    'UPI', 'NEFT', 'IMPS', 'RTGS', 'POS', 'ACH', 'NACH', 'ECS', 'ATM', 'ATW', 'NWD', 'EAW',
+    'MMT', 'BIL', 'INF', 'ONL', 'IB', 'MB', 'VPS', 'VIN', 'ECOM', 'CR', 'DR', 'TO', 'BY',
+    'TRANSFER', 'PAYMENT',
+})
+
+
+def merchant_of(description):
+    for token in normalize_tokens(description):
+        if token not in CHANNEL_WORDS:
+            return token
+    return ''
+
+
+def _paise(value):
+    if isinstance(value, (int, float)):
+        return int(round(value * 100))
+    s = str(value or '').replace(',', '').strip()
+    try:
+        return int(round(float(s) * 100)) if s else 0
+    except ValueError:
+        return 0
+
+
+def _rupees(paise):
+    return round(float(paise)) / 100
+
+
+class _Codes:
+    """
+    Interns strings (categories, merchants) as small integer codes so they
+    can be grouped with np.bincount.
+    """
+
+    def __init__(self):
+        self.names = []
+        self._index = {}
+
+    def code(self, name):
+        c = self._index.get(name)
+        if c is None:
+            c = self._index[name] = len(self.names)
+            self.names.append(name)
+        return c
+
+
+class AnalyticsStore(DatePartitionedModel):
+    """
+    Columnar copy of one transactions worksheet: NumPy arrays of date
+    ordinals, month numbers, withdrawal and deposit amounts in paise, and
+    category and merchant codes, kept sorted by date so a date range is a
+    contiguous slice found with searchsorted.
+
+    A changed date's rows are dropped with one vectorized mask and its new
+    rows appended, so /sync doesn't rebuild the arrays.
+    """
+
+    COLUMNS = (('date', np.int32), ('month', np.int32), ('withdrawal', np.int64),
+               ('deposit', np.int64), ('category', np.int32), ('merchant', np.int32),
+               ('date_key', np.int32))
+
+    def __init__(self, records=()):
+        self.categories = _Codes()
+        self.merchants = _Codes()
+        self._date_keys = _Codes()
+        self.columns = {name: np.empty(0, dtype) for name, dtype in self.COLUMNS}
+        super().__init__(records)
+
+    def _prepare(self, row):
+        try:
+            # Equivalent to strptime("%d/%m/%Y") for sheet dates, several
+            # times faster when building from a multi-year sheet.
+            day, month, year = str(row.get('Date', '')).strip().split('/')
+            d = date(int(year), int(month), int(day))
+        except ValueError:
+            return None
+        return (d.toordinal(), d.year * 12 + d.month - 1,
+                _paise(row.get('Withdrawal')), _paise(row.get('Deposit')),
+                str(row.get('Category', '')).strip(), merchant_of(row.get('Description', '')))
+
+    def _apply(self, changes):
+        cols = self.columns
+        changed = np.array([self._date_keys.code(d) for d in changes], dtype=np.int32)
+        keep = ~np.isin(cols['date_key'], changed)
+
+        added = [(ordinal, month, w, dep, self.categories.code(cat), self.merchants.code(merchant),
+                  self._date_keys.code(date))
+                 for date, (_, items) in changes.items()
+                 for ordinal, month, w, dep, cat, merchant in items]
+        if added:
+            new = np.array(added, dtype=np.int64).T
+        for i, (name, dtype) in enumerate(self.COLUMNS):
+            parts = [cols[name][keep]]
+            if added:
+                parts.append(new[i].astype(dtype))
+            cols[name] = np.concatenate(parts)
+
+        if added:
+            order = np.argsort(cols['date'], kind='stable')
+            for name in cols:
+                cols[name] = cols[name][order]
+
+    def _slice(self, from_ordinal, to_ordinal):
+        dates = self.columns['date']
+        lo = 0 if from_ordinal is None else int(np.searchsorted(dates, from_ordinal, 'left'))
+        hi = len(dates) if to_ordinal is None else int(np.searchsorted(dates, to_ordinal, 'right'))
+        return slice(lo, hi)
+
+    def window(self, from_ordinal=None, to_ordinal=None):
+        """
+        Consistent snapshot of the columns for a date range, with the category
+        and merchant names their codes refer to.
+        """
+        with self._lock:
+            window = self._slice(from_ordinal, to_ordinal)
+            cols = {name: col[window] for name, col in self.columns.items()}
+            return cols, list(self.categories.names), list(self.merchants.names)
+
+    def aggregate(self, from_ordinal=None, to_ordinal=None, top=10):
+        """
+        Totals, per-category totals, a per-month trend (overall and by
+        category) and the top merchants by spend for a date range. Amounts
+        are in rupees.
+        """
+        cols, categories, merchants = self.window(from_ordinal, to_ordinal)
+
+        w, dep, cat = cols['withdrawal'], cols['deposit'], cols['category']
+        n_cat = len(categories)
+        result = {
+            "totals": {"spend": _rupees(w.sum()), "income": _rupees(dep.sum()), "count": int(len(w))},
+            "categories": [],
+            "months": [],
+            "top_merchants": [],
+        }
+        if not len(w):
+            return result
+
+        cat_spend = np.bincount(cat, weights=w, minlength=n_cat)
+        cat_income = np.bincount(cat, weights=dep, minlength=n_cat)
+        cat_count = np.bincount(cat, minlength=n_cat)
+        present = np.flatnonzero(cat_count)
+        for c in present[np.argsort(-cat_spend[present], kind='stable')]:
+            result["categories"].append({
+                "category": categories[c], "spend": _rupees(cat_spend[c]),
+                "income": _rupees(cat_income[c]), "count": int(cat_count[c]),
+            })
+
+        # Month x category grid from one bincount over a combined key.
+        month = cols['month'] - cols['month'].min()
+        n_month = int(month.max()) + 1
+        grid = np.bincount(month * n_cat + cat, weights=w, minlength=n_month * n_cat).reshape(n_month, n_cat)
+        month_spend = grid.sum(axis=1)
+        month_income = np.bincount(month, weights=dep, minlength=n_month)
+        first = int(cols['month'].min())
+        prev = None
+        for m in range(n_month):
+            spend = float(month_spend[m])
+            by_cat = {categories[c]: _rupees(grid[m, c]) for c in np.flatnonzero(grid[m])}
+            result["months"].append({
+                "month_year": f"{(first + m) % 12 + 1:02d}/{(first + m) // 12}",
+                "spend": _rupees(spend),
+                "income": _rupees(month_income[m]),
+                "change_pct": round((spend - prev) / prev * 100, 1) if prev else None,
+                "by_category": by_cat,
+            })
+            prev = spend
+
+        spend_by_merchant = np.bincount(cols['merchant'], weights=w, minlength=len(merchants))
+        count_by_merchant = np.bincount(cols['merchant'], minlength=len(merchants))
+        if '' in merchants:
+            spend_by_merchant[merchants.index('')] = 0
+        for m in np.argsort(-spend_by_merchant, kind='stable')[:top]:
+            if spend_by_merchant[m] <= 0:
+                break
+            result["top_merchants"].append({
+                "merchant": merchants[m], "spend": _rupees(spend_by_merchant[m]),
+                "count": int(count_by_merchant[m]),
+            })
+        return result
@@ -1,10 +1,27 @@
 
-from flask import Flask, request, Response, jsonify, send_from_directory
-from bank_statement_extractor import BankStatementExtractor
+from flask import Flask, request, Response, jsonify, send_from_directory, g, stream_with_context
+from bank_statement_extractor import BankStatementExtractor, MemoryBudgetExceeded, parse_date_arg, parse_page_range
 import tempfile
 import os
+import time
+import heapq
+import threading
 import gspread
 import json
+import metrics
+import sheets_client
+from sheets_client import SheetsUnavailable
+from layout_cache import LayoutCache
+from categorizer import Categorizer
+from search_index import SearchIndex
+from analytics_store import AnalyticsStore
+from forecast import forecast_month, DEFAULT_HISTORY_MONTHS, MAX_HISTORY_MONTHS
+from budget_store import BudgetStore, HEADERS as BUDGET_HEADERS, month_index, parse_amount
+from category_store import CategoryStore
+import exporter
+from dedup import FingerprintStore, split_duplicates
+from pdf_passwords import load_keyring, candidate_passwords, probe_password
+from profiling import profiled
 from flask_cors import CORS
 from pdfminer.pdfdocument import PDFPasswordIncorrect
 from pdfplumber.pdf import PdfminerException
@@ -20,10 +37,63 @@ if os.path.exists(app.static_folder):
 else:
     print(f"WARNING: Static folder '{app.static_folder}' NOT found!")
 
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    start = g.get('request_start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+def error_response(e):
+    """
+    JSON error response for an exception caught in a handler: 503 with a
+    Retry-After hint while Google Sheets is unavailable, 500 otherwise.
+    """
+    if isinstance(e, SheetsUnavailable):
+        response = jsonify({"error": str(e), "code": "SHEETS_UNAVAILABLE"})
+        if e.retry_after:
+            response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+    import traceback
+    traceback.print_exc()
+    return jsonify({"error": str(e)}), 500
+
+def mark_stale(response, stale):
+    """
+    Flags a response served from in-memory data while Google Sheets was
+    unavailable. Every endpoint with such a fallback uses this header.
+    """
+    if stale:
+        response.headers['X-Cache-Stale'] = 'true'
+    return response
+
+@app.errorhandler(SheetsUnavailable)
+def sheets_unavailable(e):
+    return error_response(e)
+
 @app.route('/health')
 def health_check():
     return jsonify({"status": "ok"}), 200
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render_all(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/formats')
+def formats_endpoint():
+    """
+    The loaded bank formats (content version, last rejected edit) with
+    per-format parse statistics.
+    """
+    return jsonify(extractor.formats.describe())
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -37,12 +107,75 @@ def serve(path):
         else:
             return "Backend is running! Frontend build not found. Please check build logs.", 200
 
-extractor = BankStatementExtractor()
+# Optional on-disk cache of page word layouts, so re-uploads and re-parses
+# after a bank_formats.json change skip pdfminer's layout analysis.
+LAYOUT_CACHE_DIR = os.environ.get("LAYOUT_CACHE_DIR")
+LAYOUT_CACHE_MAX_MB = float(os.environ.get("LAYOUT_CACHE_MAX_MB", "256"))
+layout_cache = LayoutCache(LAYOUT_CACHE_DIR, int(LAYOUT_CACHE_MAX_MB * 1024 * 1024)) if LAYOUT_CACHE_DIR else None
+
+# bank_formats.json is re-read when it changes, checked at most this often
+# (seconds; 0 checks on every extraction).
+BANK_FORMATS_RELOAD_SECONDS = float(os.environ.get("BANK_FORMATS_RELOAD_SECONDS", "2"))
+extractor = BankStatementExtractor(layout_cache=layout_cache, reload_interval=BANK_FORMATS_RELOAD_SECONDS)
+
+# Release each page's pdfplumber layout cache once parsed so large statements
+# don't grow RSS until the container is OOM-killed.
+EXTRACT_LOW_MEMORY = os.environ.get("EXTRACT_LOW_MEMORY", "1").lower() in ("1", "true", "yes")
+# Per-request cap on RSS growth during extraction (0 disables).
+EXTRACT_MEMORY_BUDGET_MB = float(os.environ.get("EXTRACT_MEMORY_BUDGET_MB", "0") or 0)
+
+# Server-side statement passwords, {"HDFC": ["pw", ...], ...}. Candidates
+# are checked against the PDF's encryption dictionary before parsing, so an
+# encrypted upload succeeds without the user retrying with a password.
+PDF_PASSWORD_KEYRING = os.environ.get("PDF_PASSWORD_KEYRING")
+password_keyring = load_keyring(PDF_PASSWORD_KEYRING)
+
+# Fingerprints of synced rows per transactions worksheet, used to spot
+# duplicates from overlapping statements without reading the sheet. A
+# relative path is taken from the app directory, not the working directory.
+FINGERPRINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               os.environ.get("FINGERPRINT_DIR", "fingerprints"))
+fingerprints = FingerprintStore(FINGERPRINT_DIR)
+
+# The category list is served from memory; after this many seconds the next
+# request re-reads it, picking up edits made directly in the sheet.
+CATEGORIES_CACHE_TTL = float(os.environ.get("CATEGORIES_CACHE_TTL", "300"))
+category_store = CategoryStore(max_age=CATEGORIES_CACHE_TTL)
+
+# Every Google Sheets call times out after SHEETS_TIMEOUT seconds. After
+# SHEETS_BREAKER_FAILURES failures in a row (timeouts, 429s, 5xx) calls fail
+# fast with 503 for SHEETS_BREAKER_RESET seconds, then one is let through to
+# see whether Sheets has recovered.
+sheets_client.configure(
+    timeout=float(os.environ.get("SHEETS_TIMEOUT", "10")),
+    failure_threshold=int(os.environ.get("SHEETS_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.environ.get("SHEETS_BREAKER_RESET", "30")),
+)
 
 SHEET_ID = '13eQV3PW0JK0CydJeQyrnJWsNwXUQiFZoG0U96UFiYj8'
 WORKSHEET_NAME = 'transactions'
 
+def bank_worksheets(bank_name):
+    """
+    (transactions, budgets) worksheet names for a bank: HDFC is synced to
+    jeyashree's sheets, every other bank to harish's.
+    """
+    owner = "jeyashree" if bank_name == "HDFC" else "harish"
+    return f"{owner}_transactions", f"{owner}_budgets"
+
+# One client per process, so its access token and HTTP connections are
+# reused across requests.
+_gspread_client = None
+_gspread_client_lock = threading.Lock()
+
 def get_gspread_client():
+    global _gspread_client
+    with _gspread_client_lock:
+        if _gspread_client is None:
+            _gspread_client = create_gspread_client()
+        return _gspread_client
+
+def create_gspread_client():
     try:
         # Construct credentials from environment variables
         creds_dict = {
@@ -64,12 +197,13 @@ def get_gspread_client():
             return None
 
         gc = gspread.service_account_from_dict(creds_dict)
-        return gc
+        return sheets_client.connect(gc)
     except Exception as e:
         print(f"Error creating gspread client: {e}")
         return None
 
 @app.route('/extract', methods=['POST'])
+@profiled
 def extract_statement():
     if 'file' not in request.files:
         return "No file part", 400
@@ -81,19 +215,78 @@ def extract_statement():
     # Check if JSON format requested
     request_json = request.args.get('format') == 'json' or request.headers.get('Accept') == 'application/json'
     password = request.form.get('password')
-    
+
+    # Optional selective extraction: a date range, a page range, or
+    # everything after the latest date already synced for this bank.
+    try:
+        from_date = parse_date_arg(request.values.get('from_date'))
+        to_date = parse_date_arg(request.values.get('to_date'))
+        pages = request.values.get('pages') or None
+        if pages:
+            parse_page_range(pages, 0)  # validate syntax only
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not from_date and request.values.get('since_last_sync') in ('1', 'true'):
+        bank_name = request.values.get('bank', 'ICICI')
+        ws_name, _ = bank_worksheets(bank_name)
+        gc = get_gspread_client()
+        if gc:
+            try:
+                latest = get_latest_synced_date(gc.open_by_key(SHEET_ID).worksheet(ws_name))
+                # /sync replaces whole dates, so re-extract the last synced day too.
+                from_date = latest.date() if latest else None
+            except Exception as e:
+                print(f"Could not look up last sync date for {bank_name}: {e}")
+
     if file:
         temp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
         temp_path = temp.name
         try:
             file.save(temp_path)
             temp.close()
-            
+
+            candidates = candidate_passwords(password_keyring, supplied=password,
+                                             bank_hint=request.values.get('bank'))
+            with metrics.stage_timer('password_probe'):
+                matched = probe_password(temp_path, candidates)
+            if matched is not None:
+                password = matched
+
+            extract_options = {
+                "low_memory": EXTRACT_LOW_MEMORY,
+                "memory_budget_mb": EXTRACT_MEMORY_BUDGET_MB or None,
+                "from_date": from_date,
+                "to_date": to_date,
+                "pages": pages,
+            }
+            result = extractor.extract(temp_path, password=password, **extract_options)
+
+            # On request (dedup=flag|drop), rows already synced or repeated
+            # within the upload are flagged with "Duplicate": true or removed.
+            # The check is skipped if the synced rows can't be read, so
+            # extraction never depends on Sheets.
+            dedup_mode = request.values.get('dedup', 'off')
+            known = None
+            if dedup_mode in ('flag', 'drop'):
+                ws_name, _ = bank_worksheets(result['bank'])
+                try:
+                    known = known_fingerprints(ws_name)
+                except Exception as e:
+                    print(f"Skipping duplicate check for {ws_name}: {e}")
+            if known is not None:
+                unique, duplicates = split_duplicates(result['transactions'], known)
+                if dedup_mode == 'drop':
+                    result['transactions'] = unique
+                else:
+                    for t in duplicates:
+                        t['Duplicate'] = True
+                result['duplicates'] = len(duplicates)
+
             if request_json:
-                result = extractor.extract_to_json(temp_path, password=password)
                 return jsonify(result)
             else:
-                csv_content = extractor.extract_to_csv_string(temp_path, password=password)
+                csv_content = extractor.transactions_to_csv(result['transactions'])
                 return Response(
                     csv_content,
                     mimetype="text/csv",
@@ -101,18 +294,125 @@ def extract_statement():
                 )
         except PDFPasswordIncorrect:
             return jsonify({"error": "Password required or incorrect", "code": "PASSWORD_REQUIRED"}), 401
+        except MemoryBudgetExceeded as e:
+            return jsonify({"error": str(e), "code": "MEMORY_BUDGET_EXCEEDED"}), 413
         except PdfminerException as e:
             if isinstance(e.args[0], PDFPasswordIncorrect):
                 return jsonify({"error": "Password required or incorrect", "code": "PASSWORD_REQUIRED"}), 401
             return jsonify({"error": str(e)}), 500
         except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return jsonify({"error": str(e)}), 500
+            return error_response(e)
         finally:
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
 
+# In-memory models derived from each transactions worksheet: category
+# suggestions, the search index and the analytics store. Each is built from one full read on first
+# use, refreshed by /check_status (which reads the whole sheet anyway) and
+# updated in place by /sync, so requests never rescan the sheet for them.
+# The budget store indexes a budgets worksheet the same way; it is refreshed
+# by /dashboard_data and updated in place by /budget and /budgets.
+SHEET_MODEL_TYPES = {'categorizer': Categorizer, 'search_index': SearchIndex, 'analytics': AnalyticsStore,
+                     'budgets': BudgetStore}
+_sheet_models = {}
+_sheet_models_lock = threading.Lock()
+
+def read_worksheet_records(ws_name):
+    gc = get_gspread_client()
+    if not gc:
+        raise RuntimeError("Service account credentials not found")
+    try:
+        return gc.open_by_key(SHEET_ID).worksheet(ws_name).get_all_records()
+    except gspread.WorksheetNotFound:
+        return []
+
+def get_sheet_model(kind, ws_name, records=None):
+    """
+    Returns the `kind` model of ws_name, building it from `records` or, if
+    not given, from one read of the worksheet.
+    """
+    with _sheet_models_lock:
+        model = _sheet_models.get((kind, ws_name))
+    metrics.record_cache(kind, model is not None)
+    if model is not None:
+        return model
+    if records is None:
+        records = read_worksheet_records(ws_name)
+    model = SHEET_MODEL_TYPES[kind](records)
+    with _sheet_models_lock:
+        return _sheet_models.setdefault((kind, ws_name), model)
+
+def cached_sheet_model(kind, ws_name):
+    """
+    The `kind` model of ws_name if it is loaded, without reading the sheet.
+    """
+    with _sheet_models_lock:
+        return _sheet_models.get((kind, ws_name))
+
+def _sheet_models_of(ws_name):
+    with _sheet_models_lock:
+        return [m for (kind, name), m in _sheet_models.items() if name == ws_name]
+
+def sheet_records_read(ws_name, records):
+    fingerprints.rebuild(ws_name, records)
+    for model in _sheet_models_of(ws_name):
+        model.refresh(records)
+
+def sheet_dates_replaced(ws_name, all_records, new_rows, dates):
+    fingerprints.rebuild(ws_name, all_records)
+    for model in _sheet_models_of(ws_name):
+        model.update(new_rows, replace_dates=dates)
+
+def sheet_rows_appended(ws_name, new_rows):
+    fingerprints.add(ws_name, new_rows)
+    for model in _sheet_models_of(ws_name):
+        model.add(new_rows)
+
+def known_fingerprints(ws_name, worksheet=None):
+    """
+    Fingerprints of the rows synced to ws_name. The first call for a
+    worksheet seeds the store from one full read of it.
+    """
+    if not fingerprints.has_account(ws_name):
+        try:
+            if worksheet is None:
+                gc = get_gspread_client()
+                if not gc:
+                    raise RuntimeError("Service account credentials not found")
+                worksheet = gc.open_by_key(SHEET_ID).worksheet(ws_name)
+            fingerprints.rebuild(ws_name, worksheet.get_all_records())
+        except gspread.WorksheetNotFound:
+            fingerprints.rebuild(ws_name, [])
+    return fingerprints.known(ws_name)
+
+SHEET_HEADERS = ['S No', 'Date', 'Cheque No', 'Description', 'Withdrawal', 'Deposit', 'Balance', 'Category']
+
+def sheet_row(t):
+    return {
+        'S No': t.get('S No', ''),
+        'Date': t.get('Date', ''),
+        'Cheque No': t.get('Cheque No', ''),
+        'Description': t.get('Description', ''),
+        'Withdrawal': t.get('Withdrawal', '0.00'),
+        'Deposit': t.get('Deposit', '0.00'),
+        'Balance': t.get('Balance', ''),
+        'Category': t.get('Category', '')
+    }
+
+def append_new_transactions(worksheet, ws_name, transactions):
+    """
+    /sync with mode=append: appends only rows whose fingerprint isn't known
+    yet, leaving the rest of the sheet untouched and unread.
+    """
+    known = known_fingerprints(ws_name, worksheet)
+    if not known and not worksheet.row_values(1):
+        worksheet.append_row(SHEET_HEADERS)
+    new_rows, duplicates = split_duplicates([sheet_row(t) for t in transactions], known)
+    if new_rows:
+        worksheet.append_rows([[r[h] for h in SHEET_HEADERS] for r in new_rows])
+        sheet_rows_appended(ws_name, new_rows)
+    return new_rows, duplicates
+
 @app.route('/sync', methods=['POST'])
 def sync_to_sheets():
     data = request.json
@@ -139,31 +439,27 @@ def sync_to_sheets():
         except gspread.WorksheetNotFound:
             return jsonify({"error": f"Worksheet '{target_worksheet_name}' not found"}), 404
         
+        if data.get('mode') == 'append':
+            if target_dates:
+                transactions = [t for t in transactions if t.get('Date') in target_dates]
+            new_rows, duplicates = append_new_transactions(worksheet, target_worksheet_name, transactions)
+            return jsonify({"status": "success", "count": len(new_rows), "duplicates": len(duplicates),
+                            "worksheet": target_worksheet_name})
+
         # Get all existing records
         all_records = worksheet.get_all_records()
         
         # Filter keep records NOT in target_dates
         if not all_records and not worksheet.row_values(1):
             # Init headers
-            worksheet.append_row(['S No', 'Date', 'Cheque No', 'Description', 'Withdrawal', 'Deposit', 'Balance', 'Category'])
+            worksheet.append_row(SHEET_HEADERS)
             current_rows = []
         else:
             current_rows = [r for r in all_records if str(r.get('Date')) not in target_dates]
             
-        new_rows = []
-        for t in transactions:
-            if t.get('Date') in target_dates:
-                row = {
-                    'S No': t.get('S No', ''),
-                    'Date': t.get('Date', ''),
-                    'Cheque No': t.get('Cheque No', ''),
-                    'Description': t.get('Description', ''),
-                    'Withdrawal': t.get('Withdrawal', '0.00'),
-                    'Deposit': t.get('Deposit', '0.00'),
-                    'Balance': t.get('Balance', ''),
-                    'Category': t.get('Category', '')
-                }
-                new_rows.append(row)
+        # Overlapping uploads can repeat a row within the batch; keep one.
+        new_rows, duplicates = split_duplicates(
+            [sheet_row(t) for t in transactions if t.get('Date') in target_dates])
         
         final_data = current_rows + new_rows
         
@@ -179,7 +475,7 @@ def sync_to_sheets():
         
         # Write back
         # gspread update is easiest with list of lists
-        headers = ['S No', 'Date', 'Cheque No', 'Description', 'Withdrawal', 'Deposit', 'Balance', 'Category']
+        headers = SHEET_HEADERS
         
         output_data = [headers]
         for r in final_data:
@@ -188,13 +484,14 @@ def sync_to_sheets():
             
         worksheet.clear()
         worksheet.update('A1', output_data)
+
+        sheet_dates_replaced(target_worksheet_name, final_data, new_rows, target_dates)
         
-        return jsonify({"status": "success", "count": len(new_rows), "worksheet": target_worksheet_name})
+        return jsonify({"status": "success", "count": len(new_rows), "duplicates": len(duplicates),
+                        "worksheet": target_worksheet_name})
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
 @app.route('/check_status', methods=['POST'])
 def check_status():
@@ -212,16 +509,24 @@ def check_status():
     try:
         gc = get_gspread_client()
         if not gc:
-             return jsonify({})
-             
-        sh = gc.open_by_key(SHEET_ID)
+            return jsonify({"error": "Service account credentials not found"}), 500
+
+        stale = False
         try:
+            sh = gc.open_by_key(SHEET_ID)
             worksheet = sh.worksheet(target_worksheet_name)
             sheet_records = worksheet.get_all_records()
         except gspread.WorksheetNotFound:
             # Sheet doesn't exist, so everything is missing (Red)
             dates = set(t['Date'] for t in transactions if t.get('Date'))
             return jsonify({ d: 'red' for d in dates })
+        except SheetsUnavailable:
+            # Compare against the rows held in memory instead, flagged with X-Cache-Stale.
+            index = cached_sheet_model('search_index', target_worksheet_name)
+            if index is None:
+                raise
+            sheet_records = index.rows()
+            stale = True
             
         # Helper to create a signature for a transaction
         def get_sig(t):
@@ -253,6 +558,9 @@ def check_status():
             
             return f"{d}_{desc}_{w}_{dep}"
             
+        if not stale:
+            sheet_records_read(target_worksheet_name, sheet_records)
+
         # Map sheet signatures to their Category status
         sheet_map = {}
         for r in sheet_records:
@@ -291,15 +599,186 @@ def check_status():
                 date_status[date] = 'green'
             else:
                 date_status[date] = 'red'
+
+        # Suggest categories for rows the sheet has no category for yet.
+        pending = {}
+        for t in transactions:
+            sig = get_sig(t)
+            if not sheet_map.get(sig):
+                pending[sig] = t.get('Description', '')
+        suggestions = {}
+        if pending:
+            model = get_sheet_model('categorizer', target_worksheet_name, records=sheet_records)
+            for sig, suggestion in zip(pending, model.suggest_many(pending.values())):
+                if suggestion:
+                    suggestions[sig] = suggestion['category']
                 
-        return jsonify({
+        return mark_stale(jsonify({
             "dates": date_status,
-            "categories": sheet_map
-        })
+            "categories": sheet_map,
+            "suggestions": suggestions
+        }), stale)
 
     except Exception as e:
-        print(f"Check status failed: {e}")
-        return jsonify({})
+        return error_response(e)
+
+@app.route('/categorize', methods=['POST'])
+def categorize_transactions():
+    """
+    Fills in suggested categories for freshly extracted transactions, learned
+    from the bank's already categorized sheet rows. Rows that already have a
+    category are left alone.
+    """
+    data = request.json or {}
+    transactions = data.get('transactions', [])
+    bank_name = data.get('bank', 'ICICI')
+    ws_name, _ = bank_worksheets(bank_name)
+
+    try:
+        model = get_sheet_model('categorizer', ws_name)
+    except Exception as e:
+        return error_response(e)
+    suggestions = model.suggest_many(t.get('Description', '') for t in transactions)
+
+    result = []
+    applied = 0
+    for t, s in zip(transactions, suggestions):
+        if s and not t.get('Category'):
+            t = dict(t, Category=s['category'])
+            applied += 1
+        result.append(t)
+    return jsonify({"transactions": result, "suggestions": suggestions, "applied": applied})
+
+SEARCH_MAX_PAGE_SIZE = 500
+
+@app.route('/search', methods=['GET'])
+def search_transactions():
+    """
+    Full-text search over synced transaction descriptions. `q` terms match
+    whole words, or prefixes when they end in '*' ("swig*"); optional
+    filters: bank, from_date, to_date, min_amount, max_amount, category.
+    Results are newest first, paginated with page and page_size.
+    """
+    bank_name = request.args.get('bank')
+    banks = [bank_name] if bank_name else ['ICICI', 'HDFC']
+    try:
+        from_date = parse_date_arg(request.args.get('from_date'))
+        to_date = parse_date_arg(request.args.get('to_date'))
+        min_amount = request.args.get('min_amount', type=float)
+        max_amount = request.args.get('max_amount', type=float)
+        page = max(1, int(request.args.get('page', 1)))
+        page_size = min(SEARCH_MAX_PAGE_SIZE, max(1, int(request.args.get('page_size', 50))))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    per_bank = []
+    for bank in banks:
+        ws_name, _ = bank_worksheets(bank)
+        try:
+            index = get_sheet_model('search_index', ws_name)
+        except Exception as e:
+            return error_response(e)
+        hits = index.search(
+            request.args.get('q'),
+            from_ordinal=from_date.toordinal() if from_date else None,
+            to_ordinal=to_date.toordinal() if to_date else None,
+            min_amount=min_amount, max_amount=max_amount,
+            category=request.args.get('category'))
+        per_bank.append([(ordinal, bank, row) for ordinal, row in hits])
+
+    hits = list(heapq.merge(*per_bank, key=lambda h: h[0], reverse=True))
+    start = (page - 1) * page_size
+    results = [dict(row, Bank=bank) for _, bank, row in hits[start:start + page_size]]
+    return jsonify({"results": results, "total": len(hits), "page": page, "page_size": page_size})
+
+@app.route('/analytics', methods=['GET'])
+def get_analytics():
+    """
+    Aggregates over any date range (from_date/to_date, both optional):
+    totals, per-category totals, a month-by-month trend and top merchants.
+    """
+    bank_name = request.args.get('bank', 'ICICI')
+    ws_name, _ = bank_worksheets(bank_name)
+    try:
+        from_date = parse_date_arg(request.args.get('from_date'))
+        to_date = parse_date_arg(request.args.get('to_date'))
+        top = max(1, int(request.args.get('top', 10)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        store = get_sheet_model('analytics', ws_name)
+    except Exception as e:
+        return error_response(e)
+    result = store.aggregate(
+        from_ordinal=from_date.toordinal() if from_date else None,
+        to_ordinal=to_date.toordinal() if to_date else None,
+        top=top)
+    result.update({
+        "bank": bank_name,
+        "from_date": from_date.strftime("%d/%m/%Y") if from_date else None,
+        "to_date": to_date.strftime("%d/%m/%Y") if to_date else None,
+    })
+    return jsonify(result)
+
+@app.route('/forecast', methods=['GET'])
+def get_forecast():
+    """
+    Projected month-end spend per category for month_year (MM/YYYY, default
+    the current month), flagging categories on track to exceed their budget.
+    """
+    bank_name = request.args.get('bank', 'ICICI')
+    txn_ws_name, budget_ws_name = bank_worksheets(bank_name)
+    try:
+        as_of = parse_date_arg(request.args.get('as_of')) or datetime.now().date()
+        month_year = request.args.get('month_year') or as_of.strftime("%m/%Y")
+        target = month_index(month_year)
+        history = min(MAX_HISTORY_MONTHS, max(1, int(request.args.get('history', DEFAULT_HISTORY_MONTHS))))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        store = get_sheet_model('analytics', txn_ws_name)
+        budgets = get_sheet_model('budgets', budget_ws_name)
+    except Exception as e:
+        return error_response(e)
+    result = forecast_month(store, budgets, target, as_of=as_of, history=history)
+    result["bank"] = bank_name
+    return jsonify(result)
+
+@app.route('/export', methods=['GET'])
+def export_transactions():
+    """
+    Streams a bank's full synced history as Arrow IPC, Parquet or gzip CSV
+    (format=arrow|parquet|csv.gz), read from the sheet and written out in
+    batches with typed columns: date, amounts in paise, category.
+    """
+    bank_name = request.args.get('bank', 'ICICI')
+    fmt = request.args.get('format', 'csv.gz')
+    ws_name, _ = bank_worksheets(bank_name)
+    try:
+        exporter.require_format(fmt)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 501
+
+    gc = get_gspread_client()
+    if not gc:
+        return jsonify({"error": "Service account credentials not found"}), 500
+    try:
+        worksheet = gc.open_by_key(SHEET_ID).worksheet(ws_name)
+    except gspread.WorksheetNotFound:
+        return jsonify({"error": f"Worksheet '{ws_name}' not found"}), 404
+    except Exception as e:
+        return error_response(e)
+
+    mimetype, ext = exporter.FORMATS[fmt]
+    return Response(
+        stream_with_context(exporter.stream_export(exporter.read_batches(worksheet), fmt)),
+        mimetype=mimetype,
+        headers={"Content-disposition": f"attachment; filename={ws_name}{ext}"}
+    )
 
 CATEGORIES_WORKSHEET = 'categories'
 DEFAULT_CATEGORIES = ['food', 'transport', 'rent', 'salary', 'bills', 'shopping', 'investment', 'other', 'entertainment', 'health']
@@ -315,55 +794,115 @@ def get_or_create_categories_sheet(sh):
         ws.update('A1', data)
     return ws
 
+def load_categories(sh=None, force=False):
+    """
+    The categories worksheet, (re)reading it into the cache if that is stale
+    or `force` is set.
+    """
+    if sh is None:
+        gc = get_gspread_client()
+        if not gc:
+            raise RuntimeError("Service account credentials not found")
+        sh = gc.open_by_key(SHEET_ID)
+    ws = get_or_create_categories_sheet(sh)
+    if force or category_store.stale:
+        category_store.load(ws.col_values(1))
+    return ws
+
+def add_categories(names):
+    """
+    Appends the names not already listed with one append_rows call.
+
+    Mutations re-read column A first (under the store's lock), so they work
+    from the sheet as it is now rather than a copy up to the cache TTL old.
+    """
+    with category_store.lock:
+        ws = load_categories(force=True)
+        new = category_store.missing(names)
+        if new:
+            ws.append_rows([[c] for c in new])
+            category_store.appended(new)
+    return category_store.names()
+
+def remove_categories(names):
+    """
+    Deletes every row holding one of `names` with one batch_update of row
+    deletions, bottom-up so earlier deletions don't shift later ones.
+    """
+    with category_store.lock:
+        gc = get_gspread_client()
+        if not gc:
+            raise RuntimeError("Service account credentials not found")
+        sh = gc.open_by_key(SHEET_ID)
+        # Row positions must be current: rows inserted, deleted or sorted in
+        # the sheet since the last read would shift the deletions.
+        ws = load_categories(sh, force=True)
+        rows = category_store.rows_of(names)
+        if rows:
+            sh.batch_update({"requests": [
+                {"deleteDimension": {"range": {"sheetId": ws.id, "dimension": "ROWS",
+                                               "startIndex": row - 1, "endIndex": row}}}
+                for row in rows
+            ]})
+            category_store.deleted(rows)
+    return category_store.names()
+
 @app.route('/categories', methods=['GET', 'POST', 'DELETE'])
 def manage_categories():
-    gc = get_gspread_client()
-    if not gc:
-        return jsonify({"error": "Service account credentials not found"}), 500
-        
+    """
+    GET: the category list, from memory (with an ETag for conditional GETs).
+    POST / DELETE: {"category": name} or {"categories": [names]} adds or
+    removes categories in one sheet call and returns the updated list.
+    """
     try:
-        sh = gc.open_by_key(SHEET_ID)
-        ws = get_or_create_categories_sheet(sh)
-        
         if request.method == 'GET':
-            # Read Column A
-            vals = ws.col_values(1)
-            return jsonify(vals)
-            
+            hit = not category_store.stale
+            metrics.record_cache('categories', hit)
+            stale = False
+            if not hit:
+                try:
+                    load_categories()
+                except SheetsUnavailable:
+                    # Past the TTL but Sheets is down: serve the old list.
+                    if not category_store.loaded:
+                        raise
+                    stale = True
+            response = mark_stale(jsonify(category_store.names()), stale)
+            response.set_etag(category_store.etag())
+            response.cache_control.no_cache = True  # browsers revalidate with If-None-Match
+            response.headers['X-Categories-Version'] = str(category_store.version)
+            return response.make_conditional(request)
+
+        data = request.json or {}
+        names = data.get('categories')
+        if names is None:
+            names = [data.get('category', '')]
+        if not isinstance(names, list) or not any(str(n or '').strip() for n in names):
+            error = "Category couldn't be empty" if request.method == 'POST' else "Category required"
+            return jsonify({"error": error}), 400
+
         if request.method == 'POST':
-            data = request.json
-            new_cat = data.get('category', '').strip().lower()
-            if not new_cat:
-                return jsonify({"error": "Category couldn't be empty"}), 400
-            
-            existing = ws.col_values(1)
-            if new_cat in existing:
-                 return jsonify(existing)
-                 
-            # Append
-            ws.append_row([new_cat])
-            return jsonify(existing + [new_cat])
-
-        if request.method == 'DELETE':
-            data = request.json
-            cat_to_remove = data.get('category', '').strip().lower()
-            if not cat_to_remove:
-                return jsonify({"error": "Category required"}), 400
-            
-            existing = ws.col_values(1)
-            if cat_to_remove in existing:
-                # Filter out
-                updated = [c for c in existing if c != cat_to_remove]
-                # Rewrite column logic using batch update for efficiency/simplicity
-                # Clear entire column first (up to reasonable limit or just rewrite)
-                ws.clear()
-                ws.update('A1', [[c] for c in updated])
-                return jsonify(updated)
-            return jsonify(existing)
-            
+            return jsonify(add_categories(names))
+        return jsonify(remove_categories(names))
+
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        return error_response(e)
+
+def get_latest_synced_date(ws):
+    """
+    Returns the latest transaction date (datetime) in a transactions
+    worksheet, or None if it has no valid dates.
+    """
+    # Date is in 2nd column (index 1), row 1 is header
+    dates = ws.col_values(2)[1:] # Skip header
+
+    valid_dates = []
+    for d in dates:
+        try:
+            valid_dates.append(datetime.strptime(d, "%d/%m/%Y"))
+        except:
+            pass
+    return max(valid_dates) if valid_dates else None
 
 @app.route('/last_sync', methods=['GET'])
 def get_last_sync_dates():
@@ -379,24 +918,15 @@ def get_last_sync_dates():
         for name, ws_name in [("ICICI", "harish_transactions"), ("HDFC", "jeyashree_transactions")]:
             try:
                 ws = sh.worksheet(ws_name)
-                # Date is in 2nd column (index 1), row 1 is header
-                # Get all values in column 2
-                dates = ws.col_values(2)[1:] # Skip header
-                
-                valid_dates = []
-                for d in dates:
-                    try:
-                        valid_dates.append(datetime.strptime(d, "%d/%m/%Y"))
-                    except:
-                        pass
-                
-                if valid_dates:
-                    latest = max(valid_dates)
+                latest = get_latest_synced_date(ws)
+                if latest:
                     result[name] = latest.strftime("%d/%m/%Y")
                 else:
                     result[name] = "N/A"
             except gspread.WorksheetNotFound:
                 result[name] = "Sheet not found"
+            except SheetsUnavailable:
+                raise
             except Exception as e:
                 print(f"Error fetching {name}: {e}")
                 result[name] = "Error"
@@ -404,80 +934,169 @@ def get_last_sync_dates():
         return jsonify(result)
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
-@app.route('/budget', methods=['POST'])
-def update_budget():
-    data = request.json
-    bank_name = data.get('bank', 'ICICI')
-    month_year = data.get('month_year')
-    category = data.get('category')
-    amount = data.get('amount')
-    
-    if not month_year or not category:
-        return jsonify({"error": "Missing month_year or category"}), 400
-        
-    budget_ws_name = "harish_budgets" if bank_name == "ICICI" else "jeyashree_budgets"
-    
+# Serialises budget writes with the reads that rebuild the budget store, so
+# a read taken before a write can't roll back the rows it added.
+_budget_write_lock = threading.Lock()
+
+def _load_budget_store(ws_name, records):
+    # Callers hold _budget_write_lock.
+    store = get_sheet_model('budgets', ws_name, records=records)
+    store.refresh(records)
+    return store
+
+def read_budget_store(ws_name, sh):
+    """
+    Re-reads a budgets worksheet into its store, picking up edits made
+    directly in the sheet.
+    """
+    with _budget_write_lock:
+        try:
+            records = sh.worksheet(ws_name).get_all_records()
+        except gspread.WorksheetNotFound:
+            records = []
+        return _load_budget_store(ws_name, records)
+
+def write_budgets(ws_name, changes):
+    """
+    Applies [(category, month index, amount)] to a budgets worksheet: one
+    batch_update overwrites the budgets already in the sheet in place and
+    one append_rows adds the new ones, however many changes there are.
+
+    The worksheet is re-read first, under the write lock, so rows added,
+    removed or sorted directly in the sheet can't shift a write onto the
+    wrong row.
+    """
     gc = get_gspread_client()
     if not gc:
-        return jsonify({"error": "Service account credentials not found"}), 500
-        
-    try:
-        sh = gc.open_by_key(SHEET_ID)
+        raise RuntimeError("Service account credentials not found")
+    sh = gc.open_by_key(SHEET_ID)
+    with _budget_write_lock:
         try:
-            ws = sh.worksheet(budget_ws_name)
+            ws = sh.worksheet(ws_name)
+            records = ws.get_all_records()
         except gspread.WorksheetNotFound:
-            ws = sh.add_worksheet(title=budget_ws_name, rows=100, cols=3)
-            ws.append_row(['Category', 'Month-Year', 'Budget'])
-            
-        records = ws.get_all_records()
-        row_idx = None
-        for i, r in enumerate(records):
-            if r.get('Category') == category and r.get('Month-Year') == month_year:
-                row_idx = i + 2 # +2 because header is row 1, 0-index -> 2-index
-                break
-                
-        if row_idx:
-            ws.update_cell(row_idx, 3, amount)
-        else:
-            ws.append_row([category, month_year, amount])
-            
+            ws = sh.add_worksheet(title=ws_name, rows=100, cols=3)
+            ws.append_row(BUDGET_HEADERS)
+            records = []
+        store = _load_budget_store(ws_name, records)
+
+        updates, new_rows = store.plan(changes)
+        if updates:
+            ws.batch_update(updates)
+        if new_rows:
+            ws.append_rows(new_rows)
+        store.apply(changes)
+
+def parse_budget_changes(items):
+    """
+    [{"category", "month_year", "amount"}, ...] from a request body ->
+    [(category, month index, amount)]. Raises ValueError on anything
+    malformed, so nothing is written unless the whole batch is valid.
+    """
+    if not isinstance(items, list):
+        raise ValueError("Missing budgets list")
+    changes = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Each budget must be an object with category, month_year and amount")
+        category = str(item.get('category') or '').strip()
+        month_year = item.get('month_year')
+        if not month_year or not category:
+            raise ValueError("Missing month_year or category")
+        changes.append((category, month_index(month_year), parse_amount(item.get('amount'))))
+    return changes
+
+@app.route('/budget', methods=['POST'])
+def update_budget():
+    data = request.json or {}
+    try:
+        changes = parse_budget_changes([data])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    _, budget_ws_name = bank_worksheets(data.get('bank', 'ICICI'))
+
+    try:
+        write_budgets(budget_ws_name, changes)
         return jsonify({"status": "success"})
-        
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
+
+@app.route('/budgets', methods=['GET', 'POST'])
+def manage_budgets():
+    """
+    GET: the budgets in force for month_year (MM/YYYY).
+    POST: sets many budgets at once, {"bank": ..., "budgets": [{"category",
+    "month_year", "amount"}, ...]}: the budgets worksheet is re-read, then
+    existing budgets are overwritten with one batch_update and new ones
+    added with one append_rows.
+    """
+    if request.method == 'GET':
+        bank_name = request.args.get('bank', 'ICICI')
+        _, budget_ws_name = bank_worksheets(bank_name)
+        month_year = request.args.get('month_year') or datetime.now().strftime("%m/%Y")
+        try:
+            month = month_index(month_year)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        try:
+            store = get_sheet_model('budgets', budget_ws_name)
+        except Exception as e:
+            return error_response(e)
+        return jsonify({"bank": bank_name, "month_year": month_year, "budgets": store.effective_all(month)})
+
+    data = request.json or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    _, budget_ws_name = bank_worksheets(data.get('bank', 'ICICI'))
+    try:
+        changes = parse_budget_changes(data.get('budgets'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        write_budgets(budget_ws_name, changes)
+        return jsonify({"status": "success", "updated": len({(c, m) for c, m, _ in changes})})
+    except Exception as e:
+        return error_response(e)
 
 @app.route('/dashboard_data', methods=['GET'])
+@profiled
 def get_dashboard_data():
     bank_name = request.args.get('bank', 'ICICI')
     selected_month_year = request.args.get('month_year') # MM/YYYY
     
-    txn_ws_name = "harish_transactions" if bank_name == "ICICI" else "jeyashree_transactions"
-    budget_ws_name = "harish_budgets" if bank_name == "ICICI" else "jeyashree_budgets"
+    txn_ws_name, budget_ws_name = bank_worksheets(bank_name)
     
     gc = get_gspread_client()
     if not gc:
         return jsonify({"error": "Service account credentials not found"}), 500
         
     try:
-        sh = gc.open_by_key(SHEET_ID)
+        stale = False
         try:
+            sh = gc.open_by_key(SHEET_ID)
             txn_ws = sh.worksheet(txn_ws_name)
             txns = txn_ws.get_all_records()
+            # Brings every loaded model (analytics, categorizer, search) in
+            # line with the rows just read, including direct sheet edits.
+            sheet_records_read(txn_ws_name, txns)
+            budgets = read_budget_store(budget_ws_name, sh)
+            # Keeps a copy of the rows to fall back on while Sheets is down.
+            get_sheet_model('search_index', txn_ws_name, records=txns)
         except gspread.WorksheetNotFound:
             return jsonify({"month_years": [], "data": [], "balance": None, "selected_month_year": None})
-            
-        try:
-            budget_ws = sh.worksheet(budget_ws_name)
-            budgets = budget_ws.get_all_records()
-        except gspread.WorksheetNotFound:
-            budgets = []
-            
+        except SheetsUnavailable:
+            # Serve the rows the in-memory models hold (as of the last read
+            # or sync), flagged with X-Cache-Stale.
+            index = cached_sheet_model('search_index', txn_ws_name)
+            if index is None:
+                raise
+            txns = index.rows()
+            budgets = cached_sheet_model('budgets', budget_ws_name) or BudgetStore()
+            stale = True
+
         # Extract unique month-years
         month_years = set()
         for t in txns:
@@ -544,37 +1163,13 @@ def get_dashboard_data():
             except:
                 pass
                 
-        # Group all budgets by category
-        all_budgets_by_cat = {}
-        for b in budgets:
-            cat = b.get('Category')
-            my = b.get('Month-Year')
-            bud = b.get('Budget')
-            if cat and my:
-                if cat not in all_budgets_by_cat:
-                    all_budgets_by_cat[cat] = []
-                try:
-                    # Convert MM/YYYY to datetime for sorting
-                    d = datetime.strptime(my, "%m/%Y")
-                    all_budgets_by_cat[cat].append((d, my, bud))
-                except ValueError:
-                    pass
-        
-        # Determine the effective budget for the selected month
-        budget_map = {}
+        # Budget in force for the selected month, per category
         try:
-            selected_d = datetime.strptime(selected_month_year, "%m/%Y")
+            selected_month = month_index(selected_month_year)
         except ValueError:
-            selected_d = None
-            
-        for cat, hist in all_budgets_by_cat.items():
-            hist.sort(key=lambda x: x[0])
-            effective_budget = None
-            if selected_d:
-                for d, my, bud in hist:
-                    if d <= selected_d:
-                        effective_budget = bud
-            budget_map[cat] = effective_budget
+            selected_month = None
+        budget_map = {cat: budgets.effective(cat, selected_month) if selected_month is not None else None
+                      for cat in budgets.categories}
                 
         result_data = []
         for cat, total in category_totals.items():
@@ -597,20 +1192,31 @@ def get_dashboard_data():
                      "transactions": []
                  })
                  
+        # Month-end projection for the selected month, from the analytics
+        # store (built from the records just read if it isn't loaded yet).
+        try:
+            store = get_sheet_model('analytics', txn_ws_name, records=txns)
+            projection = forecast_month(store, budgets, month_index(selected_month_year))
+            by_cat = {f['category']: f for f in projection['categories']}
+            for item in result_data:
+                f = by_cat.get(item['category'])
+                item['projected'] = f['projected'] if f else item['amount']
+                item['forecast_status'] = f['status'] if f else None
+        except Exception as e:
+            print(f"Forecast failed: {e}")
+
         # Sort data largest expense first
         result_data.sort(key=lambda x: x['amount'], reverse=True)
             
-        return jsonify({
+        return mark_stale(jsonify({
             "month_years": sorted_month_years,
             "selected_month_year": selected_month_year,
             "data": result_data,
             "balance": balance
-        })
+        }), stale)
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
 
 if __name__ == '__main__':
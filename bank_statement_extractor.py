@@ -2,85 +2,326 @@
 import pdfplumber
 import csv
 import io
-import json
 import os
+import gc
+import time
+from datetime import datetime, date
+from metrics import stage_timer
+from layout_cache import DocumentLayout, PageLayout, LayoutCache
+from format_registry import FormatRegistry
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+def current_rss_mb():
+    """
+    Resident set size of this process in MB, or None where /proc is unavailable.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def parse_date_arg(value):
+    """
+    Accepts a date, a datetime or a 'DD/MM/YYYY' / 'YYYY-MM-DD' string.
+    Returns a date, None for empty input, and raises ValueError otherwise.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date '{value}', expected DD/MM/YYYY or YYYY-MM-DD")
+
+
+def parse_page_range(spec, page_count):
+    """
+    Turns '1-3,7' (1-based, inclusive) or an iterable of page numbers into a
+    sorted list of 0-based page indices within the document.
+    """
+    if spec is None or spec == '':
+        return list(range(page_count))
+    if isinstance(spec, str):
+        numbers = set()
+        for part in spec.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if '-' in part:
+                start, _, end = part.partition('-')
+                start = int(start) if start.strip() else 1
+                end = int(end) if end.strip() else page_count
+                numbers.update(range(start, end + 1))
+            else:
+                numbers.add(int(part))
+    else:
+        numbers = set(int(n) for n in spec)
+    if any(n < 1 for n in numbers):
+        raise ValueError(f"Invalid page range '{spec}': pages start at 1")
+    return sorted(n - 1 for n in numbers if n <= page_count)
+
 
 class BankStatementExtractor:
-    def __init__(self, config_path='bank_formats.json'):
-        self.config = self.load_config(config_path)
+    # Format markers (table headings, bank name) sit near the top of page 1;
+    # detection only looks at words above this fraction of the page height
+    # before falling back to the rest of the page.
+    HEADER_REGION_FRACTION = 0.4
 
-    def load_config(self, config_path):
+    def __init__(self, config_path='bank_formats.json', layout_cache=None, reload_interval=2.0):
         if not os.path.isabs(config_path):
             # assume relative to this file if not absolute
             base_dir = os.path.dirname(os.path.abspath(__file__))
             config_path = os.path.join(base_dir, config_path)
-        
-        try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"Warning: Config file not found at {config_path}")
-            return []
+        # Formats are re-read when the file changes (checked at most every
+        # reload_interval seconds; None disables reloading).
+        self.formats = FormatRegistry(config_path, check_interval=reload_interval)
+        self.layout_cache = layout_cache
+
+    @property
+    def config(self):
+        return self.formats.current().config
 
-    def extract(self, pdf_path, password=None):
+    def extract(self, pdf_path, password=None, low_memory=False, memory_budget_mb=None,
+                from_date=None, to_date=None, pages=None):
         """
         Extracts transactions from a PDF file path.
-        Returns a dict: {'transactions': list, 'bank': str}
+        Returns a dict: {'transactions': list, 'bank': str, 'pages_parsed': int}
+
+        from_date / to_date (inclusive) keep only transactions in that range.
+        Statements are chronological, so pages entirely before from_date are
+        skipped without being parsed and extraction stops at the first page
+        running past to_date. pages limits extraction to a page range such as
+        '1-3,7'.
+
+        If the extractor has a layout_cache, word layouts are read from and
+        saved to it, so re-parsing a known PDF skips pdfminer entirely.
+
+        low_memory releases each page's cached layout objects as soon as it
+        has been parsed, so memory stays flat regardless of page count.
+        memory_budget_mb bounds how much RSS may grow during this call: past
+        it extraction drops to low-memory mode, and MemoryBudgetExceeded is
+        raised if that is not enough.
         """
         print(f"Extracting from {pdf_path}...")
         transactions = []
+        baseline_rss = current_rss_mb() if memory_budget_mb else None
+        from_date = parse_date_arg(from_date)
+        to_date = parse_date_arg(to_date)
+        pages_parsed = 0
         
+        # The formats in force when extraction starts are used throughout,
+        # even if the file is reloaded meanwhile.
+        formats = self.formats.current()
         # Default to first format marked as default or just the last one if none
-        selected_format = next((f for f in self.config if f.get('detection', {}).get('default')), self.config[-1] if self.config else None)
+        selected_format = formats.default_format or (formats.config[-1] if formats.config else None)
         bank_name = selected_format['name'] if selected_format else "Unknown"
-        
+
+        # With a layout cache, pages laid out on an earlier run are parsed
+        # straight from their cached words and the PDF is only opened if some
+        # page we need is missing.
+        cache_key = self.layout_cache.key_for(pdf_path, password) if self.layout_cache else None
+        layout = self.layout_cache.get(cache_key) if cache_key else None
+        layout_dirty = False
+        pdf = None
+
+        def open_pdf():
+            nonlocal pdf, layout
+            if pdf is None:
+                with stage_timer('pdf_open'):
+                    pdf = pdfplumber.open(pdf_path, password=password)
+                if cache_key and (layout is None or layout.page_count != len(pdf.pages)):
+                    layout = DocumentLayout([None] * len(pdf.pages))
+            return pdf
+
+        def page_words(page_idx):
+            nonlocal low_memory, layout_dirty
+            if layout is not None and layout.has_page(page_idx):
+                return layout.pages[page_idx].words(), layout.pages[page_idx].height
+            page = open_pdf().pages[page_idx]
+            with stage_timer('extract_words'):
+                words = page.extract_words()
+            height = page.height
+            if cache_key:
+                layout.pages[page_idx] = PageLayout.from_words(words, height)
+                layout_dirty = True
+            if low_memory:
+                # pdfplumber keeps chars/layout cached on the page for the
+                # life of the document; drop them now that we are done.
+                page.close()
+            if baseline_rss is not None:
+                low_memory = self._enforce_memory_budget(pdf, page_idx, baseline_rss, memory_budget_mb, low_memory)
+            return words, height
+
         try:
-            with pdfplumber.open(pdf_path, password=password) as pdf:
-                # Detect format from first page (usually sufficient)
-                if len(pdf.pages) > 0:
-                    first_page_words = pdf.pages[0].extract_words()
-                    detected = self._detect_format(first_page_words)
-                    if detected:
-                        selected_format = detected
-                        bank_name = selected_format['name']
-                        print(f"Detected Format: {bank_name}")
-                
-                if not selected_format:
-                    raise Exception("No suitable format configuration found.")
+            page_count = layout.page_count if layout is not None else len(open_pdf().pages)
+
+            # Detect format from first page (usually sufficient). Its words
+            # are kept and reused when the page is parsed below.
+            first_page_words = None
+            if page_count > 0:
+                first_page_words, first_height = page_words(0)
+                with stage_timer('detect_format'):
+                    detected = self._detect_format(
+                        first_page_words, header_bottom=first_height * self.HEADER_REGION_FRACTION,
+                        formats=formats)
+                if detected:
+                    selected_format = detected
+                    bank_name = selected_format['name']
+                    print(f"Detected Format: {bank_name}")
+            
+            if not selected_format:
+                raise Exception("No suitable format configuration found.")
 
-                for page_idx, page in enumerate(pdf.pages):
+            parsed = {}
+
+            def parse(page_idx):
+                if page_idx not in parsed:
                     print(f"Processing Page {page_idx + 1}")
-                    page_transactions = self._parse_page(page, selected_format)
+                    words = first_page_words if page_idx == 0 else page_words(page_idx)[0]
+                    began = time.perf_counter()
+                    with stage_timer('parse_page'):
+                        parsed[page_idx] = self._parse_words(words, selected_format)
+                    self.formats.record_page(bank_name, len(parsed[page_idx]), time.perf_counter() - began)
+                return parsed[page_idx]
+
+            candidates = parse_page_range(pages, page_count)
+            start = 0
+            if from_date and candidates:
+                start = self._find_start_page(candidates, parse, from_date)
+
+            for page_idx in candidates[start:]:
+                page_transactions = parse(page_idx)
+                if from_date or to_date:
+                    page_dates = [self._transaction_date(t) for t in page_transactions]
+                    transactions.extend(
+                        t for t, d in zip(page_transactions, page_dates)
+                        if d is None or ((not from_date or d >= from_date) and (not to_date or d <= to_date)))
+                    if to_date and any(d and d > to_date for d in page_dates):
+                        break
+                else:
                     transactions.extend(page_transactions)
-                    
+            pages_parsed = len(parsed)
+            self.formats.record_document(bank_name)
+
         except Exception as e:
              print(f"Error processing PDF: {e}")
              raise e
+        finally:
+            if pdf is not None:
+                pdf.close()
+
+        if layout_dirty:
+            try:
+                self.layout_cache.put(cache_key, layout)
+            except OSError as e:
+                print(f"Warning: could not write layout cache: {e}")
         
         return {
             "bank": bank_name,
-            "transactions": transactions
+            "transactions": transactions,
+            "pages_parsed": pages_parsed
         }
+
+    def _transaction_date(self, txn):
+        try:
+            return datetime.strptime(txn.get('Date', ''), "%d/%m/%Y").date()
+        except (TypeError, ValueError):
+            return None
+
+    def _find_start_page(self, candidates, parse, from_date):
+        """
+        Returns the position in `candidates` of the first page that can hold
+        transactions on or after from_date: the last page whose first date is
+        before from_date. Searches backwards from the end with doubling steps
+        and then bisects, so "new transactions only" costs one or two page
+        parses and any other start is found in O(log pages).
+        """
+        def starts_before(pos):
+            dates = [d for d in map(self._transaction_date, parse(candidates[pos])) if d]
+            # Pages without dates (summaries, blank pages) never justify
+            # skipping ahead; treating them as "not before" is always safe.
+            return bool(dates) and min(dates) < from_date
+
+        last = len(candidates) - 1
+        if starts_before(last):
+            return last
+        # Gallop backwards until a page starts before from_date.
+        known_after, step = last, 1
+        while True:
+            pos = max(known_after - step, 0)
+            if starts_before(pos):
+                break
+            if pos == 0:
+                return 0
+            known_after, step = pos, step * 2
+        # starts_before(pos) is True and starts_before(known_after) is False.
+        lo, hi = pos, known_after
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if starts_before(mid):
+                lo = mid
+            else:
+                hi = mid
+        return lo
     
-    def _detect_format(self, words):
-        # Gather all text to check against markers
-        # Simple implementation: check if any marker is present in any word
-        # Ideally we might want full text search but words check is fast
-        word_texts = set(w['text'] for w in words)
-        
-        for fmt in self.config:
-            detection = fmt.get('detection', {})
-            # Check text_present
-            if 'text_present' in detection:
-                markers = detection['text_present']
-                # If any marker is found, we assume this format
-                # Using 'any' match logic here as per previous logic (if "WithdrawalAmt." in words)
-                if any(marker in word_texts for marker in markers):
-                    return fmt
-        
+    def _enforce_memory_budget(self, pdf, page_idx, baseline_rss, budget_mb, low_memory):
+        """
+        Returns True once the caller should be in low-memory mode.
+
+        RSS never shrinks after freeing (the allocator keeps the pages), so
+        the budget is soft: the first time it is exceeded every parsed page's
+        cache is released and extraction continues in low-memory mode, reusing
+        that memory. Only if RSS still climbs past twice the budget is the
+        request aborted.
+        """
+        used = current_rss_mb() - baseline_rss
+        if used <= budget_mb:
+            return low_memory
+        if not low_memory:
+            for page in pdf.pages:
+                page.close()
+            gc.collect()
+            print(f"Memory budget reached at page {page_idx + 1} ({used:.0f} MB), switching to low-memory mode")
+            return True
+        if used > 2 * budget_mb:
+            raise MemoryBudgetExceeded(
+                f"Extraction used {used:.0f} MB after page {page_idx + 1}, over the {budget_mb:g} MB budget")
+        return True
+
+    def _detect_format(self, words, header_bottom=None, formats=None):
+        """
+        Returns the format whose marker appears first among `words`, looking
+        at the header region (words above `header_bottom`) before the rest of
+        the page, or the default format when no marker is present.
+        """
+        formats = formats or self.formats.current()
+        index = formats.marker_index
+        if header_bottom is not None:
+            for w in words:
+                if w['top'] < header_bottom:
+                    fmt = index.get(w['text'])
+                    if fmt:
+                        return fmt
+            words = [w for w in words if w['top'] >= header_bottom]
+
+        for w in words:
+            fmt = index.get(w['text'])
+            if fmt:
+                return fmt
+
         # If no specific marker found, return default
-        default = next((f for f in self.config if f.get('detection', {}).get('default')), None)
-        return default
+        return formats.default_format
 
     def _clean_amount(self, amount_str):
         if not amount_str: return "0.00"
@@ -103,9 +344,14 @@ class BankStatementExtractor:
             
         return date_str
 
-    def _parse_page(self, page, fmt_config):
-        words = page.extract_words()
-        
+    def _parse_page(self, page, fmt_config, words=None):
+        if words is None:
+            with stage_timer('extract_words'):
+                words = page.extract_words()
+        with stage_timer('parse_page'):
+            return self._parse_words(words, fmt_config)
+
+    def _parse_words(self, words, fmt_config):
         # Group into lines
         lines = {} 
         for w in words:
@@ -271,12 +517,17 @@ class BankStatementExtractor:
         return re.sub(r'\s+', ' ', desc).strip()
 
 
-    def extract_to_csv_string(self, pdf_path, password=None):
+    def extract_to_csv_string(self, pdf_path, password=None, **kwargs):
         """
         Extracts and returns CSV content as a string.
         """
-        result = self.extract(pdf_path, password=password)
-        transactions = result['transactions']
+        result = self.extract(pdf_path, password=password, **kwargs)
+        return self.transactions_to_csv(result['transactions'])
+
+    def transactions_to_csv(self, transactions):
+        """
+        Serializes extracted transactions to CSV content.
+        """
         output = io.StringIO()
         headers = ['S No', 'Date', 'Cheque No', 'Description', 'Withdrawal', 'Deposit', 'Balance']
         writer = csv.DictWriter(output, fieldnames=headers, extrasaction='ignore') # ignore extra keys if any
@@ -284,17 +535,17 @@ class BankStatementExtractor:
         writer.writerows(transactions)
         return output.getvalue()
 
-    def extract_to_json(self, pdf_path, password=None):
+    def extract_to_json(self, pdf_path, password=None, **kwargs):
         """
         Extracts and returns list of dictionaries.
         """
-        return self.extract(pdf_path, password=password)
+        return self.extract(pdf_path, password=password, **kwargs)
 
-    def extract_to_file(self, pdf_path, csv_path, password=None):
+    def extract_to_file(self, pdf_path, csv_path, password=None, **kwargs):
         """
         Extracts and writes to a file.
         """
-        csv_content = self.extract_to_csv_string(pdf_path, password=password)
+        csv_content = self.extract_to_csv_string(pdf_path, password=password, **kwargs)
         with open(csv_path, 'w', newline='') as f:
             f.write(csv_content)
         print(f"Written to {csv_path}")
@@ -302,10 +553,36 @@ class BankStatementExtractor:
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='Extract bank statement to CSV.')
-    parser.add_argument('pdf_path', help='Path to the input PDF file')
-    parser.add_argument('csv_path', help='Path to the output CSV file')
+    parser.add_argument('pdf_path', help='Path to the input PDF file, or a directory of PDFs')
+    parser.add_argument('csv_path', help='Path to the output CSV file (.jsonl for JSON lines in directory mode)')
     parser.add_argument('--password', help='Password for PDF file', default=None)
+    parser.add_argument('--low-memory', action='store_true', help='Release each page\'s layout cache after parsing it')
+    parser.add_argument('--memory-budget-mb', type=float, default=None, help='Abort if extraction grows RSS by more than this')
+    parser.add_argument('--from-date', help='Only transactions on or after this date (DD/MM/YYYY)', default=None)
+    parser.add_argument('--to-date', help='Only transactions on or before this date (DD/MM/YYYY)', default=None)
+    parser.add_argument('--pages', help='Page range to extract, e.g. 1-3,7', default=None)
+    parser.add_argument('--layout-cache', help='Directory for cached page layouts (re-parse without re-reading the PDF)', default=None)
+    parser.add_argument('--layout-cache-mb', type=float, default=256, help='Size limit of the layout cache')
+    # Directory mode
+    parser.add_argument('--workers', type=int, default=None, help='Directory mode: worker processes (default: CPU count)')
+    parser.add_argument('--manifest', help='Directory mode: manifest path (default: <output>.manifest.json)', default=None)
+    parser.add_argument('--keyfile', help='JSON of passwords per bank to try, e.g. {"HDFC": ["pw"]}', default=None)
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'], default=None, help='Directory mode: output format (default: from extension)')
     args = parser.parse_args()
 
-    extractor = BankStatementExtractor()
-    extractor.extract_to_file(args.pdf_path, args.csv_path, password=args.password)
+    if os.path.isdir(args.pdf_path):
+        from batch_extract import extract_directory
+        failed = extract_directory(args.pdf_path, args.csv_path, output_format=args.output_format,
+                                   workers=args.workers, manifest_path=args.manifest,
+                                   keyfile=args.keyfile, layout_cache_dir=args.layout_cache)
+        raise SystemExit(1 if failed else 0)
+
+    layout_cache = LayoutCache(args.layout_cache, int(args.layout_cache_mb * 1024 * 1024)) if args.layout_cache else None
+    extractor = BankStatementExtractor(layout_cache=layout_cache)
+    password = args.password
+    if args.keyfile:
+        from pdf_passwords import load_keyring, candidate_passwords, probe_password
+        password = probe_password(args.pdf_path, candidate_passwords(load_keyring(args.keyfile), supplied=password)) or password
+    extractor.extract_to_file(args.pdf_path, args.csv_path, password=password,
+                              low_memory=args.low_memory, memory_budget_mb=args.memory_budget_mb,
+                              from_date=args.from_date, to_date=args.to_date, pages=args.pages)
@@ -0,0 +1,212 @@
+
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pdfminer.pdfdocument import PDFPasswordIncorrect
+
+from dedup import fingerprint
+from pdf_passwords import load_keyring, candidate_passwords, probe_password
+
+OUTPUT_HEADERS = ['Source', 'Bank', 'S No', 'Date', 'Cheque No', 'Description', 'Withdrawal', 'Deposit', 'Balance']
+MANIFEST_VERSION = 1
+
+# One extractor per worker process, built lazily on first use.
+_worker_extractor = None
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _get_extractor(layout_cache_dir):
+    global _worker_extractor
+    if _worker_extractor is None:
+        from bank_statement_extractor import BankStatementExtractor
+        from layout_cache import LayoutCache
+        cache = LayoutCache(layout_cache_dir) if layout_cache_dir else None
+        _worker_extractor = BankStatementExtractor(layout_cache=cache)
+    return _worker_extractor
+
+
+def _extract_one(pdf_path, rel_path, part_path, keyring, layout_cache_dir):
+    """
+    Runs in a worker process: extracts one PDF into a JSONL part file and
+    returns its manifest entry fields.
+    """
+    extractor = _get_extractor(layout_cache_dir)
+
+    start = time.perf_counter()
+    try:
+        password = probe_password(pdf_path, candidate_passwords(keyring))
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = extractor.extract(pdf_path, password=password, low_memory=True)
+    except PDFPasswordIncorrect:
+        return {"status": "error", "error": "Password required or incorrect"}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+    tmp = part_path + '.tmp'
+    with open(tmp, 'w') as f:
+        for t in result['transactions']:
+            row = dict(t, Source=rel_path, Bank=result['bank'])
+            f.write(json.dumps(row) + '\n')
+    os.replace(tmp, part_path)
+    return {
+        "status": "ok",
+        "bank": result['bank'],
+        "transactions": len(result['transactions']),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+class Manifest:
+    """
+    Records which PDFs (by content hash) have already been extracted, and
+    into which part file, so re-runs skip unchanged files and an interrupted
+    run resumes where it stopped. Saved atomically after every file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.files = data.get('files', {})
+
+    def is_current(self, rel_path, sha, parts_dir):
+        entry = self.files.get(rel_path)
+        return bool(entry and entry.get('sha256') == sha and entry.get('status') == 'ok'
+                    and os.path.exists(os.path.join(parts_dir, entry['part'])))
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def find_pdfs(root):
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith('.pdf'):
+                found.append(os.path.join(dirpath, name))
+    return found
+
+
+def merge_parts(manifest, parts_dir, output_path, output_format):
+    """
+    Concatenates the part files in path order. Rows already written from an
+    earlier file (overlapping statements) are skipped by fingerprint.
+    Returns (rows written, duplicates skipped).
+    """
+    tmp = output_path + '.tmp'
+    count = 0
+    seen = set()
+    duplicates = 0
+    with open(tmp, 'w', newline='') as out:
+        writer = None
+        if output_format == 'csv':
+            writer = csv.DictWriter(out, fieldnames=OUTPUT_HEADERS, extrasaction='ignore')
+            writer.writeheader()
+        for rel_path in sorted(manifest.files):
+            entry = manifest.files[rel_path]
+            if entry.get('status') != 'ok':
+                continue
+            with open(os.path.join(parts_dir, entry['part'])) as part:
+                for line in part:
+                    row = json.loads(line)
+                    fp = fingerprint(row)
+                    if fp in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(fp)
+                    if writer:
+                        writer.writerow(row)
+                    else:
+                        out.write(line)
+                    count += 1
+    os.replace(tmp, output_path)
+    return count, duplicates
+
+
+def extract_directory(root, output_path, output_format=None, workers=None, manifest_path=None,
+                      keyfile=None, layout_cache_dir=None):
+    """
+    Extracts every PDF under `root` into one merged CSV or JSONL file.
+    """
+    output_format = output_format or ('jsonl' if output_path.endswith('.jsonl') else 'csv')
+    manifest_path = manifest_path or output_path + '.manifest.json'
+    parts_dir = output_path + '.parts'
+    os.makedirs(parts_dir, exist_ok=True)
+
+    manifest = Manifest(manifest_path)
+    keyring = load_keyring(keyfile)
+
+    pdfs = find_pdfs(root)
+    seen = set()
+    todo = []
+    for path in pdfs:
+        rel_path = os.path.relpath(path, root)
+        seen.add(rel_path)
+        sha = file_sha256(path)
+        if manifest.is_current(rel_path, sha, parts_dir):
+            continue
+        todo.append((path, rel_path, sha))
+
+    # PDFs deleted since the last run drop out of the merged output.
+    for rel_path in list(manifest.files):
+        if rel_path not in seen:
+            del manifest.files[rel_path]
+
+    print(f"Found {len(pdfs)} PDFs, {len(pdfs) - len(todo)} unchanged, {len(todo)} to extract")
+    failed = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for path, rel_path, sha in todo:
+                # Keyed by path and content, so identical copies of a PDF in
+                # two folders each keep their own Source column.
+                part = hashlib.sha1(rel_path.encode('utf-8')).hexdigest()[:12] + '-' + sha[:16] + '.jsonl'
+                fut = pool.submit(_extract_one, path, rel_path, os.path.join(parts_dir, part), keyring, layout_cache_dir)
+                futures[fut] = (rel_path, sha, part)
+            for done, fut in enumerate(as_completed(futures), start=1):
+                rel_path, sha, part = futures[fut]
+                try:
+                    info = fut.result()
+                except Exception as e:
+                    info = {"status": "error", "error": str(e)}
+                manifest.files[rel_path] = dict(info, sha256=sha, part=part)
+                manifest.save()
+                if info['status'] != 'ok':
+                    failed += 1
+                    print(f"[{done}/{len(todo)}] {rel_path}: FAILED {info['error']}")
+                else:
+                    print(f"[{done}/{len(todo)}] {rel_path}: {info['bank']}, {info['transactions']} transactions")
+    manifest.save()
+
+    # Remove part files no longer referenced by the manifest.
+    referenced = {e['part'] for e in manifest.files.values() if 'part' in e}
+    for name in os.listdir(parts_dir):
+        if name not in referenced:
+            os.unlink(os.path.join(parts_dir, name))
+
+    count, duplicates = merge_parts(manifest, parts_dir, output_path, output_format)
+    print(f"Written {count} transactions to {output_path} "
+          f"({duplicates} duplicates skipped, {failed} files failed)")
+    return failed
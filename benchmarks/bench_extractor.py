@@ -0,0 +1,175 @@
+
+"""
+Benchmarks BankStatementExtractor against synthetic statements.
+
+For every (bank, pages, multiline density) case this times:
+  - the full `extract()` call,
+  - `_detect_format` on page 1,
+  - `_parse_page` for every page (split into word extraction and parsing),
+and checks the output against the generator's ground truth. Results are
+written as JSON so runs from different commits can be compared:
+
+    python benchmarks/bench_extractor.py --out before.json
+    git checkout my-branch
+    python benchmarks/bench_extractor.py --out after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import pdfplumber  # noqa: E402
+from bank_statement_extractor import BankStatementExtractor  # noqa: E402
+from metrics import EXTRACT_STAGE_SECONDS  # noqa: E402
+from synthetic_pdf import generate_statement, compare  # noqa: E402
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def corpus_path(corpus_dir, bank, pages, density):
+    """
+    Returns the path of a generated statement, generating it on first use.
+    """
+    path = os.path.join(corpus_dir, f"{bank.lower()}_{pages}p_d{int(density * 100)}.pdf")
+    truth_path = path[:-4] + ".json"
+    if not (os.path.exists(path) and os.path.exists(truth_path)):
+        _, expected = generate_statement(bank, pages, density, path=path)
+        with open(truth_path, "w") as f:
+            json.dump(expected, f)
+    with open(truth_path) as f:
+        return path, json.load(f)
+
+
+def bench_case(extractor, path, expected, repeat):
+    quiet = io.StringIO()
+    extract_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(quiet):
+            result = extractor.extract(path)
+        extract_times.append(time.perf_counter() - start)
+    problems = compare(result["transactions"], expected)
+
+    # Per-stage timings on fresh documents so nothing is warm from extract().
+    with contextlib.redirect_stdout(quiet), pdfplumber.open(path) as pdf:
+        first_page = pdf.pages[0]
+        first_words = first_page.extract_words()
+        header_bottom = first_page.height * extractor.HEADER_REGION_FRACTION
+        start = time.perf_counter()
+        fmt = extractor._detect_format(first_words, header_bottom=header_bottom)
+        detect_time = time.perf_counter() - start
+
+    words_before = EXTRACT_STAGE_SECONDS.snapshot(stage="extract_words")[1]
+    parse_before = EXTRACT_STAGE_SECONDS.snapshot(stage="parse_page")[1]
+    with contextlib.redirect_stdout(quiet), pdfplumber.open(path) as pdf:
+        page_times = []
+        for page in pdf.pages:
+            start = time.perf_counter()
+            extractor._parse_page(page, fmt)
+            page_times.append(time.perf_counter() - start)
+            page.close()
+    words_time = EXTRACT_STAGE_SECONDS.snapshot(stage="extract_words")[1] - words_before
+    parse_time = EXTRACT_STAGE_SECONDS.snapshot(stage="parse_page")[1] - parse_before
+
+    n_pages = len(page_times)
+    n_txns = len(result["transactions"])
+    best = min(extract_times)
+    return {
+        "bank": result["bank"],
+        "pages": n_pages,
+        "transactions": n_txns,
+        "extract_seconds": best,
+        "extract_seconds_median": statistics.median(extract_times),
+        "extract_ms_per_page": best * 1000 / n_pages,
+        "extract_us_per_transaction": best * 1e6 / n_txns if n_txns else None,
+        "detect_format_ms": detect_time * 1000,
+        "parse_page_ms_mean": statistics.mean(page_times) * 1000,
+        "extract_words_ms_per_page": words_time * 1000 / n_pages,
+        "parse_words_ms_per_page": parse_time * 1000 / n_pages,
+        "parse_page_ms_max": max(page_times) * 1000,
+        "parse_page_us_per_transaction": sum(page_times) * 1e6 / n_txns if n_txns else None,
+        "correct": not problems,
+        "problems": problems[:5],
+    }
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {c["case"]: c for c in json.load(f)["cases"]}
+    print(f"\n{'case':<24}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for case in results["cases"]:
+        old = baseline.get(case["case"])
+        if not old:
+            continue
+        before = old["extract_seconds"] * 1000
+        after = case["extract_seconds"] * 1000
+        print(f"{case['case']:<24}{before:>12.1f}{after:>12.1f}{before / after:>9.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BankStatementExtractor on synthetic statements.")
+    parser.add_argument("--banks", default="HDFC,ICICI")
+    parser.add_argument("--pages", default="1,10,50,200", help="Comma-separated page counts")
+    parser.add_argument("--density", default="0,0.3,0.8", help="Comma-separated multiline densities (0-1)")
+    parser.add_argument("--repeat", type=int, default=3, help="extract() runs per case (best is reported)")
+    parser.add_argument("--corpus-dir", default=None, help="Where to keep generated PDFs (default: temp dir)")
+    parser.add_argument("--out", default=None, help="Write JSON results here")
+    parser.add_argument("--compare", default=None, help="Baseline JSON results to compare against")
+    args = parser.parse_args()
+
+    corpus_dir = args.corpus_dir or os.path.join(tempfile.gettempdir(), "expense_tracker_bench_corpus")
+    os.makedirs(corpus_dir, exist_ok=True)
+    extractor = BankStatementExtractor()
+
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pdfplumber": pdfplumber.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cases": [],
+    }
+    failed = False
+    for bank in args.banks.split(","):
+        for pages in [int(p) for p in args.pages.split(",")]:
+            for density in [float(d) for d in args.density.split(",")]:
+                path, expected = corpus_path(corpus_dir, bank, pages, density)
+                case = bench_case(extractor, path, expected, args.repeat)
+                case["case"] = f"{bank}/{pages}p/d{density:g}"
+                case["multiline_density"] = density
+                results["cases"].append(case)
+                failed = failed or not case["correct"]
+                status = "ok" if case["correct"] else "MISMATCH " + "; ".join(case["problems"][:2])
+                print(f"{case['case']:<24} {case['extract_seconds'] * 1000:9.1f} ms "
+                      f"{case['extract_ms_per_page']:7.2f} ms/page "
+                      f"words {case['extract_words_ms_per_page']:6.2f} / parse {case['parse_words_ms_per_page']:6.2f} ms/page "
+                      f"detect {case['detect_format_ms']:6.3f} ms  {status}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Written to {args.out}")
+    if args.compare:
+        print_comparison(results, args.compare)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
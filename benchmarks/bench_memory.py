@@ -0,0 +1,81 @@
+
+"""
+Measures peak RSS growth of BankStatementExtractor.extract() as page count
+grows, with and without low-memory mode. Each measurement runs in a fresh
+subprocess so peaks from one case don't leak into the next.
+
+    python benchmarks/bench_memory.py --pages 10,50,100,200
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(pdf_path, low_memory):
+    """
+    Runs in the child process: prints {"baseline_mb", "peak_mb", "transactions"}.
+    """
+    from bank_statement_extractor import BankStatementExtractor
+    extractor = BankStatementExtractor()
+    baseline = _peak_rss_mb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = extractor.extract(pdf_path, low_memory=low_memory)
+    print(json.dumps({"baseline_mb": baseline, "peak_mb": _peak_rss_mb(),
+                      "transactions": len(result["transactions"])}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of extract() vs page count.")
+    parser.add_argument("--pages", default="10,50,100,200")
+    parser.add_argument("--bank", default="ICICI")
+    parser.add_argument("--density", type=float, default=0.3)
+    parser.add_argument("--corpus-dir", default=None)
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--child", nargs=2, metavar=("PDF", "LOW_MEMORY"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child[0], args.child[1] == "1")
+        return
+
+    from bench_extractor import corpus_path
+    corpus_dir = args.corpus_dir or os.path.join(tempfile.gettempdir(), "expense_tracker_bench_corpus")
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    rows = []
+    print(f"{'pages':>6}{'default MB':>14}{'low-memory MB':>16}")
+    for pages in [int(p) for p in args.pages.split(",")]:
+        path, _ = corpus_path(corpus_dir, args.bank, pages, args.density)
+        row = {"pages": pages}
+        for label, flag in (("default", "0"), ("low_memory", "1")):
+            out = subprocess.check_output([sys.executable, __file__, "--child", path, flag])
+            stats = json.loads(out.decode().strip().splitlines()[-1])
+            row[f"{label}_growth_mb"] = stats["peak_mb"] - stats["baseline_mb"]
+            row["transactions"] = stats["transactions"]
+        rows.append(row)
+        print(f"{pages:>6}{row['default_growth_mb']:>14.1f}{row['low_memory_growth_mb']:>16.1f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"bank": args.bank, "density": args.density, "cases": rows}, f, indent=2)
+        print(f"Written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
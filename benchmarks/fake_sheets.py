@@ -0,0 +1,274 @@
+
+"""
+In-process stand-in for the parts of gspread's Client / Spreadsheet /
+Worksheet surface that app.py uses, so the Sheets-backed endpoints can be
+load-tested without the real spreadsheet or its quota.
+
+Every call sleeps for a configurable latency and can fail with an injected
+HTTP 429 (as gspread.exceptions.APIError), mimicking a throttled API. Calls
+slower than the client's timeout raise requests' ReadTimeout, as gspread would.
+"""
+import json
+import random
+import threading
+import time
+
+import gspread
+import requests
+from gspread.utils import a1_to_rowcol, numericise_all
+
+from sheets_client import register_type
+
+
+class FakeBackendConfig:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.timeout = None  # seconds, set through FakeClient.set_timeout
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_ms + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+            throttle = self.error_rate and self.rng.random() < self.error_rate
+            if throttle:
+                self.throttled += 1
+        if self.timeout is not None and delay / 1000.0 > self.timeout:
+            time.sleep(self.timeout)
+            raise requests.exceptions.ReadTimeout("Read timed out (fake backend)")
+        if delay:
+            time.sleep(delay / 1000.0)
+        if throttle:
+            raise _api_error(429, "Quota exceeded for quota metric 'Read requests' (fake backend)")
+
+
+def _api_error(code, message):
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps(
+        {"error": {"code": code, "message": message, "status": "RESOURCE_EXHAUSTED"}}
+    ).encode()
+    return gspread.exceptions.APIError(response)
+
+
+class FakeWorksheet:
+    _next_id = 0
+
+    def __init__(self, backend, title, rows=1000, cols=26):
+        self._backend = backend
+        FakeWorksheet._next_id += 1
+        self.id = FakeWorksheet._next_id
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self._cells = []  # list of rows, each a list of strings
+        self._lock = threading.Lock()
+
+    # --- reads ---
+
+    def get_all_records(self, head=1, **kwargs):
+        self._backend.before_call()
+        with self._lock:
+            rows = [list(r) for r in self._cells]
+        if len(rows) < head:
+            return []
+        keys = rows[head - 1]
+        records = []
+        for row in rows[head:]:
+            row = row + [""] * (len(keys) - len(row))
+            records.append(dict(zip(keys, numericise_all(row[:len(keys)]))))
+        return records
+
+    def get_all_values(self, **kwargs):
+        self._backend.before_call()
+        with self._lock:
+            return [list(r) for r in self._cells]
+
+    def col_values(self, col, **kwargs):
+        self._backend.before_call()
+        with self._lock:
+            values = [r[col - 1] if len(r) >= col else "" for r in self._cells]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def get(self, range_name=None, **kwargs):
+        # Like the API, values come back as strings with trailing empty rows
+        # and cells trimmed.
+        self._backend.before_call()
+        first, _, last = (range_name or "A1").partition(":")
+        row0, col0 = a1_to_rowcol(first)
+        row1, col1 = a1_to_rowcol(last) if last else (row0, col0)
+        with self._lock:
+            rows = [[str(v) for v in r[col0 - 1:col1]] for r in self._cells[row0 - 1:row1]]
+        for r in rows:
+            while r and r[-1] == "":
+                r.pop()
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def row_values(self, row, **kwargs):
+        self._backend.before_call()
+        with self._lock:
+            if row > len(self._cells):
+                return []
+            return list(self._cells[row - 1])
+
+    # --- writes ---
+
+    def update(self, values=None, range_name=None, **kwargs):
+        # Accept both the gspread 6 order (values, range) and the legacy
+        # (range, values) order still used by app.py.
+        if isinstance(values, str):
+            values, range_name = range_name, values
+        self._backend.before_call()
+        row, col = a1_to_rowcol((range_name or "A1").split(":")[0])
+        with self._lock:
+            for i, vals in enumerate(values):
+                self._set_row(row + i, col, vals)
+        return {"updatedRows": len(values)}
+
+    def batch_update(self, data, **kwargs):
+        self._backend.before_call()
+        with self._lock:
+            for entry in data:
+                row, col = a1_to_rowcol(entry["range"].split(":")[0])
+                for i, vals in enumerate(entry["values"]):
+                    self._set_row(row + i, col, vals)
+        return {"totalUpdatedRows": sum(len(e["values"]) for e in data)}
+
+    def update_cell(self, row, col, value):
+        self._backend.before_call()
+        with self._lock:
+            self._set_row(row, col, [value])
+
+    def append_row(self, values, **kwargs):
+        self._backend.before_call()
+        with self._lock:
+            self._cells.append([_cell(v) for v in values])
+            self.row_count = max(self.row_count, len(self._cells))
+
+    def append_rows(self, values, **kwargs):
+        self._backend.before_call()
+        with self._lock:
+            self._cells.extend([_cell(v) for v in row] for row in values)
+            self.row_count = max(self.row_count, len(self._cells))
+        return {"updates": {"updatedRows": len(values)}}
+
+    def clear(self):
+        self._backend.before_call()
+        with self._lock:
+            self._cells = []
+
+    def _delete_rows(self, start_index, end_index):
+        with self._lock:
+            del self._cells[start_index:end_index]
+            self.row_count -= end_index - start_index
+
+    def _set_row(self, row, col, vals):
+        self.row_count = max(self.row_count, row)
+        while len(self._cells) < row:
+            self._cells.append([])
+        target = self._cells[row - 1]
+        needed = col - 1 + len(vals)
+        if len(target) < needed:
+            target.extend([""] * (needed - len(target)))
+        for j, v in enumerate(vals):
+            target[col - 1 + j] = _cell(v)
+
+    # --- seeding helpers (no latency, not part of the gspread surface) ---
+
+    def load_rows(self, rows):
+        with self._lock:
+            self._cells = [[_cell(v) for v in r] for r in rows]
+            self.row_count = max(self.row_count, len(self._cells))
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    return str(value)
+
+
+class FakeSpreadsheet:
+    def __init__(self, backend, key):
+        self._backend = backend
+        self.id = key
+        self._worksheets = {}
+        self._lock = threading.Lock()
+
+    def worksheet(self, title):
+        self._backend.before_call()
+        with self._lock:
+            ws = self._worksheets.get(title)
+        if ws is None:
+            raise gspread.WorksheetNotFound(title)
+        return ws
+
+    def worksheets(self):
+        self._backend.before_call()
+        with self._lock:
+            return list(self._worksheets.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self._backend.before_call()
+        with self._lock:
+            if title in self._worksheets:
+                raise _api_error(400, f'A sheet with the name "{title}" already exists.')
+            ws = FakeWorksheet(self._backend, title, rows, cols)
+            self._worksheets[title] = ws
+            return ws
+
+    def batch_update(self, body):
+        # Only the deleteDimension (ROWS) requests app.py sends are supported.
+        self._backend.before_call()
+        with self._lock:
+            by_id = {ws.id: ws for ws in self._worksheets.values()}
+        for req in body["requests"]:
+            r = req["deleteDimension"]["range"]
+            by_id[r["sheetId"]]._delete_rows(r["startIndex"], r["endIndex"])
+        return {"replies": [{} for _ in body["requests"]]}
+
+    def seed(self, title, rows):
+        """
+        Creates (or replaces) a worksheet holding `rows` without simulated latency.
+        """
+        with self._lock:
+            ws = self._worksheets.get(title) or FakeWorksheet(self._backend, title)
+            self._worksheets[title] = ws
+        ws.load_rows(rows)
+        return ws
+
+
+class FakeClient:
+    def __init__(self, config=None):
+        self.config = config or FakeBackendConfig()
+        self._spreadsheets = {}
+        self._lock = threading.Lock()
+
+    def set_timeout(self, timeout):
+        self.config.timeout = timeout
+
+    def open_by_key(self, key):
+        self.config.before_call()
+        with self._lock:
+            if key not in self._spreadsheets:
+                self._spreadsheets[key] = FakeSpreadsheet(self.config, key)
+            return self._spreadsheets[key]
+
+    def spreadsheet(self, key):
+        """
+        Direct access for seeding, bypassing latency and error injection.
+        """
+        with self._lock:
+            return self._spreadsheets.setdefault(key, FakeSpreadsheet(self.config, key))
+
+
+for _cls in (FakeClient, FakeSpreadsheet, FakeWorksheet):
+    register_type(_cls)
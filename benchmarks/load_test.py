@@ -0,0 +1,221 @@
+
+"""
+HTTP load driver for the Flask app, backed by the in-process fake Google
+Sheets from fake_sheets.py so no real spreadsheet or quota is involved.
+
+Replays a weighted mix of /sync, /check_status, /dashboard_data and /extract
+from several threads and reports throughput and p50/p95/p99 per endpoint:
+
+    python benchmarks/load_test.py --duration 30 --threads 8 \\
+        --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+"""
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import app as app_module  # noqa: E402
+import sheets_client  # noqa: E402
+from fake_sheets import FakeBackendConfig, FakeClient  # noqa: E402
+from synthetic_pdf import generate_statement, MERCHANTS  # noqa: E402
+
+HEADERS = ['S No', 'Date', 'Cheque No', 'Description', 'Withdrawal', 'Deposit', 'Balance', 'Category']
+CATEGORIES = ['food', 'transport', 'rent', 'bills', 'shopping', 'entertainment', 'health', 'other']
+BANK_SHEETS = {"ICICI": ("harish_transactions", "harish_budgets"),
+               "HDFC": ("jeyashree_transactions", "jeyashree_budgets")}
+
+
+def seed_rows(rng, months, per_day):
+    rows = [HEADERS]
+    start = date.today().replace(day=1) - timedelta(days=30 * (months - 1))
+    balance = 500_000.0
+    day = start
+    serial = 1
+    while day <= date.today():
+        for _ in range(rng.randint(0, per_day * 2)):
+            amount = round(rng.uniform(20, 5000), 2)
+            balance -= amount
+            rows.append([serial, day.strftime("%d/%m/%Y"), "",
+                         f"UPI/{rng.choice(MERCHANTS)}/{rng.randint(10**11, 10**12 - 1)}",
+                         f"{amount:.2f}", "0.00", f"{balance:.2f}",
+                         rng.choice(CATEGORIES) if rng.random() < 0.8 else ""])
+            serial += 1
+        day += timedelta(days=1)
+    return rows
+
+
+def build_backend(args):
+    config = FakeBackendConfig(args.latency_ms, args.jitter_ms, args.error_rate, seed=args.seed)
+    client = FakeClient(config)
+    sh = client.spreadsheet(app_module.SHEET_ID)
+    rng = random.Random(args.seed)
+    records = {}
+    for bank, (txn_ws, budget_ws) in BANK_SHEETS.items():
+        rows = seed_rows(rng, args.months, args.per_day)
+        sh.seed(txn_ws, rows)
+        records[bank] = [dict(zip(HEADERS, r)) for r in rows[1:]]
+        month = date.today().strftime("%m/%Y")
+        sh.seed(budget_ws, [['Category', 'Month-Year', 'Budget']] +
+                [[c, month, rng.randint(1000, 20000)] for c in CATEGORIES])
+    sh.seed(app_module.CATEGORIES_WORKSHEET, [[c] for c in app_module.DEFAULT_CATEGORIES])
+    return client, records
+
+
+class Scenario:
+    """
+    Builds one request per call for the chosen endpoint, drawn from the
+    seeded data so /check_status and /sync see realistic payloads.
+    """
+
+    def __init__(self, records, pdf_bytes, seed):
+        self.records = records
+        self.pdf_bytes = pdf_bytes
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sample_day(self, bank):
+        with self._lock:
+            rows = self.records[bank]
+            pivot = self.rng.randrange(len(rows))
+        day = rows[pivot]['Date']
+        return day, [dict(r) for r in rows if r['Date'] == day]
+
+    def request(self, client, endpoint):
+        bank = self.rng.choice(list(BANK_SHEETS))
+        if endpoint == "/dashboard_data":
+            return client.get(f"/dashboard_data?bank={bank}")
+        if endpoint == "/check_status":
+            _, txns = self._sample_day(bank)
+            return client.post("/check_status", json={"bank": bank, "transactions": txns})
+        if endpoint == "/search":
+            term = self.rng.choice(MERCHANTS).split()[0].lower()[:4]
+            return client.get(f"/search?bank={bank}&q={term}*")
+        if endpoint == "/categorize":
+            _, txns = self._sample_day(bank)
+            return client.post("/categorize", json={"bank": bank, "transactions": txns})
+        if endpoint == "/sync":
+            day, txns = self._sample_day(bank)
+            return client.post("/sync", json={"bank": bank, "dates": [day], "transactions": txns})
+        if endpoint == "/extract":
+            data = {"file": (io.BytesIO(self.pdf_bytes), "statement.pdf")}
+            return client.post("/extract?format=json", data=data, content_type="multipart/form-data")
+        raise ValueError(endpoint)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run(args):
+    client_backend, records = build_backend(args)
+    gc = sheets_client.connect(client_backend)
+    app_module.get_gspread_client = lambda: gc
+    pdf_bytes, _ = generate_statement("ICICI", args.extract_pages, 0.3)
+    scenario = Scenario(records, pdf_bytes, args.seed)
+
+    mix = {}
+    for part in args.mix.split(","):
+        name, weight = part.split("=")
+        mix["/" + name.strip().lstrip("/")] = float(weight)
+    endpoints, weights = list(mix), list(mix.values())
+
+    latencies = collections.defaultdict(list)
+    statuses = collections.defaultdict(collections.Counter)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    remaining = [args.requests] if args.requests else None
+
+    def worker(worker_id):
+        rng = random.Random(f"{args.seed}-{worker_id}")
+        client = app_module.app.test_client()
+        while time.perf_counter() < deadline:
+            if remaining is not None:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+            endpoint = rng.choices(endpoints, weights)[0]
+            start = time.perf_counter()
+            resp = scenario.request(client, endpoint)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[endpoint].append(elapsed)
+                statuses[endpoint][resp.status_code] += 1
+
+    started = time.perf_counter()
+    # The app prints per-request debug lines and tracebacks; keep the report readable.
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    wall = time.perf_counter() - started
+
+    report = {"wall_seconds": wall, "threads": args.threads,
+              "backend_calls": client_backend.config.calls,
+              "backend_throttled": client_backend.config.throttled,
+              "endpoints": {}}
+    total = 0
+    for endpoint in endpoints:
+        values = sorted(latencies[endpoint])
+        total += len(values)
+        report["endpoints"][endpoint] = {
+            "requests": len(values),
+            "throughput_rps": len(values) / wall if wall else 0,
+            "p50_ms": (percentile(values, 50) or 0) * 1000,
+            "p95_ms": (percentile(values, 95) or 0) * 1000,
+            "p99_ms": (percentile(values, 99) or 0) * 1000,
+            "status": dict(statuses[endpoint]),
+        }
+    report["throughput_rps"] = total / wall if wall else 0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the app against a fake Google Sheets backend.")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = duration only)")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--mix", default="sync=1,check_status=3,dashboard_data=4,extract=1",
+                        help="Endpoint weights, e.g. 'dashboard_data=5,extract=1'")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Base latency per fake Sheets call")
+    parser.add_argument("--jitter-ms", type=float, default=25, help="Extra uniform random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of Sheets calls failing with 429")
+    parser.add_argument("--months", type=int, default=12, help="Months of seeded history per bank")
+    parser.add_argument("--per-day", type=int, default=4, help="Average seeded transactions per day")
+    parser.add_argument("--extract-pages", type=int, default=3, help="Pages in the uploaded statement")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(f"{'endpoint':<18}{'requests':>10}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  status")
+    for endpoint, r in report["endpoints"].items():
+        print(f"{endpoint:<18}{r['requests']:>10}{r['throughput_rps']:>9.1f}{r['p50_ms']:>10.1f}"
+              f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}  {r['status']}")
+    print(f"total {report['throughput_rps']:.1f} req/s over {report['wall_seconds']:.1f}s, "
+          f"{report['backend_calls']} Sheets calls ({report['backend_throttled']} throttled)")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+
+"""
+Generates synthetic HDFC / ICICI statement PDFs offline, laid out to match the
+column ranges in bank_formats.json, together with the transactions the
+extractor is expected to return for them.
+
+No PDF library is needed: the writer below emits a plain PDF 1.4 file using
+the built-in Helvetica font, which pdfminer knows the metrics for, so word
+positions come out exactly where they are placed here.
+"""
+import hashlib
+import json
+import os
+import random
+from datetime import date, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGE_WIDTH = 700
+PAGE_HEIGHT = 842
+FONT_SIZE = 8
+LINE_HEIGHT = 12
+FIRST_ROW_TOP = 170
+LAST_ROW_TOP = PAGE_HEIGHT - 130
+FOOTER_TOP = PAGE_HEIGHT - 40
+# Continuation lines are spaced so the nearest-neighbour strategy (50px
+# threshold) always attaches them to their own row, never the next one.
+MAX_EXTRA_LINES = 3
+
+MERCHANTS = [
+    "SWIGGY", "ZOMATO", "AMAZON", "FLIPKART", "UBER", "OLA", "IRCTC", "BIGBASKET",
+    "NETFLIX", "AIRTEL", "JIO", "BESCOM", "APOLLO PHARMACY", "DMART", "MYNTRA",
+    "BOOKMYSHOW", "PETROL PUMP", "CAFE COFFEE", "ELECTRICITY", "GROCERY MART",
+]
+CHANNELS = ["UPI", "NEFT", "IMPS", "POS", "ACH"]
+CONTINUATIONS = [
+    "PAYMENT FOR ORDER", "REF MONTHLY PLAN", "SENT USING PAYTM", "NOTE KIND REGARDS",
+    "COLLECT REQUEST", "AUTOPAY SI", "MERCHANT SETTLEMENT", "ONLINE PURCHASE",
+]
+
+
+def load_formats():
+    with open(os.path.join(ROOT_DIR, "bank_formats.json")) as f:
+        return {fmt["name"]: fmt for fmt in json.load(f)}
+
+
+# --- Minimal PDF writer ---
+
+# Standard security handler, revision 2 (40-bit RC4): the simplest scheme
+# pdfminer decrypts, enough to exercise password handling.
+_PASSWORD_PAD = bytes.fromhex(
+    "28BF4E5E4E758A4164004E56FFFA01082E2E00B6D0683E802F0CA9FE6453697A")
+_PERMISSIONS = -4
+
+
+def _rc4(key, data):
+    s = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + s[i] + key[i % len(key)]) % 256
+        s[i], s[j] = s[j], s[i]
+    out = bytearray()
+    i = j = 0
+    for byte in data:
+        i = (i + 1) % 256
+        j = (j + s[i]) % 256
+        s[i], s[j] = s[j], s[i]
+        out.append(byte ^ s[(s[i] + s[j]) % 256])
+    return bytes(out)
+
+
+def _encryption(password, doc_id):
+    padded = (password.encode("latin-1") + _PASSWORD_PAD)[:32]
+    owner = _rc4(hashlib.md5(padded).digest()[:5], padded)
+    key = hashlib.md5(padded + owner + _PERMISSIONS.to_bytes(4, "little", signed=True) + doc_id).digest()[:5]
+    user = _rc4(key, _PASSWORD_PAD)
+    return key, owner, user
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(pages, path=None, password=None):
+    """
+    `pages` is a list of pages, each a list of (x, top, text) tuples where
+    `top` is measured from the top edge like pdfplumber reports it.
+    Returns the PDF bytes (and writes them to `path` if given). With
+    `password` the content streams are RC4-encrypted under that user password.
+    """
+    objects = []  # 1-based object bodies
+    doc_id = hashlib.md5(repr(pages).encode()).digest()
+    key = owner = user = None
+    if password is not None:
+        key, owner, user = _encryption(password, doc_id)
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    for items in pages:
+        ops = []
+        for x, top, text in items:
+            baseline = PAGE_HEIGHT - top - FONT_SIZE
+            ops.append(f"BT /F1 {FONT_SIZE} Tf {x:.2f} {baseline:.2f} Td ({_escape(text)}) Tj ET")
+        stream = "\n".join(ops).encode("latin-1")
+        if key:
+            obj_num = len(objects) + 1
+            obj_key = hashlib.md5(key + obj_num.to_bytes(3, "little") + b"\0\0").digest()[:10]
+            stream = _rc4(obj_key, stream)
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>".encode()
+        ))
+
+    encrypt_ref = b""
+    if key:
+        encrypt_id = add(b"<< /Filter /Standard /V 1 /R 2 /O <%s> /U <%s> /P %d >>"
+                         % (owner.hex().encode(), user.hex().encode(), _PERMISSIONS))
+        encrypt_ref = b" /Encrypt %d 0 R" % encrypt_id
+
+    objects[catalog_id - 1] = f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode()
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects[pages_id - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root %d 0 R /ID [<%s> <%s>]%s >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, doc_id.hex().encode(), doc_id.hex().encode(), encrypt_ref, xref_at)
+
+    data = bytes(out)
+    if path:
+        with open(path, "wb") as f:
+            f.write(data)
+    return data
+
+
+# --- Statement layouts ---
+
+def _fmt_amount(paise):
+    return f"{paise // 100:,}.{paise % 100:02d}"
+
+
+def _col_x(fmt, name):
+    col = next(c for c in fmt["columns"] if c["name"] == name)
+    return col["x_min"] + 5
+
+
+def _transactions(rng, multiline_density, start):
+    balance = rng.randint(50_000_00, 200_000_00)
+    day = start
+    while True:
+        if rng.random() < 0.35:
+            day += timedelta(days=1)
+        merchant = rng.choice(MERCHANTS)
+        channel = rng.choice(CHANNELS)
+        ref = "".join(rng.choice("0123456789") for _ in range(12))
+        first = f"{channel}/{merchant}/{ref}"
+        extra = []
+        if rng.random() < multiline_density:
+            extra = [rng.choice(CONTINUATIONS) for _ in range(rng.randint(1, MAX_EXTRA_LINES))]
+
+        amount = rng.randint(10_00, 25_000_00)
+        if rng.random() < 0.15 or amount > balance:
+            balance += amount
+            withdrawal, deposit = None, amount
+        else:
+            balance -= amount
+            withdrawal, deposit = amount, None
+
+        yield {
+            "date": day,
+            "lines": [first] + extra,
+            "withdrawal": withdrawal,
+            "deposit": deposit,
+            "balance": balance,
+        }
+
+
+def _page_header(bank, fmt, page_no):
+    items = []
+    if page_no == 0:
+        if bank == "HDFC":
+            items += [(20, 40, "HDFC BANK Ltd."), (20, 55, "Statement of account"),
+                      (20, 70, "Address 2NDFLOOR SALAISTREET")]
+        else:
+            items += [(20, 40, "Account Name: TEST USER"), (20, 55, "Account Number: XXXXXXXX1234")]
+    if bank == "HDFC":
+        header = [("Date", "Date"), ("Description", "Narration"), ("Withdrawal", "WithdrawalAmt."),
+                  ("Deposit", "DepositAmt."), ("Balance", "ClosingBalance")]
+    else:
+        header = [("S No", "S No"), ("Date", "Value Date"), ("Cheque No", "Cheque"),
+                  ("Description", "Transaction Remarks"), ("Withdrawal", "Withdrawal"),
+                  ("Deposit", "Deposit"), ("Balance", "Balance")]
+    for col, text in header:
+        items.append((_col_x(fmt, col), 140, text))
+    return items
+
+
+def generate_statement(bank, pages, multiline_density=0.3, seed=0, path=None, password=None):
+    """
+    Builds a `pages`-page statement for `bank` ("HDFC" or "ICICI"),
+    encrypted if `password` is given.
+    Returns (pdf_bytes, expected) where `expected` is the list of
+    transactions the extractor should produce, keyed like its output.
+    """
+    fmt = load_formats()[bank]
+    rng = random.Random(f"{bank}-{pages}-{multiline_density}-{seed}")
+    txn_iter = _transactions(rng, multiline_density, date(2024, 4, 1))
+    pending = next(txn_iter)
+
+    page_items = []
+    expected = []
+    serial = 1
+    for page_no in range(pages):
+        items = _page_header(bank, fmt, page_no)
+        top = FIRST_ROW_TOP
+        while True:
+            t = pending
+            n_extra = len(t["lines"]) - 1
+            # Block height: main line, continuation lines and a gap. The gap
+            # grows with the continuation lines so the last of them is always
+            # closer to its own row than to the next one.
+            block = LINE_HEIGHT * (1 + 2 * n_extra) + 8
+            if top + block > LAST_ROW_TOP:
+                break
+            pending = next(txn_iter)
+
+            if bank == "HDFC":
+                date_text = t["date"].strftime("%d/%m/%y")
+            else:
+                date_text = t["date"].strftime("%d/%m/%Y")
+                items.append((_col_x(fmt, "S No"), top, str(serial)))
+            items.append((_col_x(fmt, "Date"), top, date_text))
+            items.append((_col_x(fmt, "Description"), top, t["lines"][0]))
+            if t["withdrawal"] is not None:
+                items.append((_col_x(fmt, "Withdrawal"), top, _fmt_amount(t["withdrawal"])))
+            if t["deposit"] is not None:
+                items.append((_col_x(fmt, "Deposit"), top, _fmt_amount(t["deposit"])))
+            items.append((_col_x(fmt, "Balance"), top, _fmt_amount(t["balance"])))
+            for k, line in enumerate(t["lines"][1:], start=1):
+                items.append((_col_x(fmt, "Description"), top + k * LINE_HEIGHT, line))
+
+            row = {
+                "Date": t["date"].strftime("%d/%m/%Y"),
+                "Description": " ".join(t["lines"]),
+                "Withdrawal": f"{t['withdrawal'] / 100:.2f}" if t["withdrawal"] is not None else "0.00",
+                "Deposit": f"{t['deposit'] / 100:.2f}" if t["deposit"] is not None else "0.00",
+                "Balance": f"{t['balance'] / 100:.2f}",
+            }
+            if bank == "ICICI":
+                row["S No"] = str(serial)
+            expected.append(row)
+            serial += 1
+            top += block
+
+        items.append((250, FOOTER_TOP, f"Page {page_no + 1} of {pages} - computer generated statement"))
+        page_items.append(items)
+
+    return write_pdf(page_items, path, password=password), expected
+
+
+def compare(actual, expected):
+    """
+    Compares extractor output against ground truth on the fields the
+    generator controls. Returns a list of human-readable mismatches.
+    """
+    problems = []
+    if len(actual) != len(expected):
+        problems.append(f"expected {len(expected)} transactions, got {len(actual)}")
+    for i, (a, e) in enumerate(zip(actual, expected)):
+        for key, want in e.items():
+            got = a.get(key)
+            if key in ("Withdrawal", "Deposit", "Balance"):
+                try:
+                    same = abs(float(got) - float(want)) < 0.005
+                except (TypeError, ValueError):
+                    same = False
+            else:
+                same = got == want
+            if not same:
+                problems.append(f"row {i} {key}: expected {want!r}, got {got!r}")
+                break
+        if len(problems) > 20:
+            break
+    return problems
@@ -0,0 +1,151 @@
+
+import math
+import threading
+from bisect import bisect_right, insort
+
+HEADERS = ['Category', 'Month-Year', 'Budget']
+
+
+def month_index(month_year):
+    """
+    "MM/YYYY" -> months since year 0, the same numbering as the analytics
+    store's month column.
+    """
+    try:
+        month, year = (int(part) for part in str(month_year).strip().split('/'))
+    except ValueError:
+        month = year = 0
+    if not 1 <= month <= 12 or not 1 <= year <= 9999:
+        raise ValueError(f"Invalid month_year '{month_year}' (expected MM/YYYY)")
+    return year * 12 + month - 1
+
+
+def _amount(value):
+    if isinstance(value, (int, float)):
+        return value
+    s = str(value if value is not None else '').replace(',', '').strip()
+    if not s:
+        return None
+    try:
+        f = float(s)
+    except ValueError:
+        return None
+    return int(f) if f.is_integer() else f
+
+
+def parse_amount(value):
+    """
+    A budget amount from a request (a number or numeric string) as a
+    non-negative int or float.
+    """
+    amount = None if isinstance(value, bool) else _amount(value)
+    if amount is None or not math.isfinite(amount) or amount < 0:
+        raise ValueError(f"Invalid budget amount '{value}'")
+    return amount
+
+
+class BudgetStore:
+    """
+    Index over one budgets worksheet (Category, Month-Year, Budget).
+
+    Rows are keyed on (category, month index) with the sheet row they live
+    on, so a batch of changes is split into overwrites and appends with
+    dict lookups, and each category's months are kept sorted so the budget
+    in force for a month (the one set for the latest month not after it)
+    is a bisection.
+    """
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        self.refresh(records)
+
+    def refresh(self, records):
+        """
+        Rebuilds the index from a full read of the worksheet.
+        """
+        rows = {}
+        months = {}
+        for i, r in enumerate(records):
+            category = str(r.get('Category', '')).strip()
+            try:
+                m = month_index(r.get('Month-Year', ''))
+            except ValueError:
+                continue
+            if not category:
+                continue
+            if (category, m) not in rows:
+                insort(months.setdefault(category, []), m)
+            # A repeated (category, month) row: the last one wins, as it
+            # would have on the dashboard.
+            rows[(category, m)] = (i + 2, _amount(r.get('Budget')))
+        with self._lock:
+            self._rows = rows
+            self._months = months
+            self.next_row = len(records) + 2
+
+    # --- lookups ---
+
+    @property
+    def categories(self):
+        with self._lock:
+            return sorted(self._months)
+
+    def _effective(self, category, month):
+        months = self._months.get(category, ())
+        i = bisect_right(months, month)
+        return self._rows[(category, months[i - 1])][1] if i else None
+
+    def effective(self, category, month):
+        """
+        Budget in force for `category` in `month` (a month index), or None.
+        """
+        with self._lock:
+            return self._effective(category, month)
+
+    def effective_all(self, month):
+        """
+        {category: budget} for every category with a budget in force in `month`.
+        """
+        with self._lock:
+            budgets = {cat: self._effective(cat, month) for cat in self._months}
+        return {cat: b for cat, b in budgets.items() if b is not None}
+
+    # --- writes ---
+
+    def plan(self, changes):
+        """
+        Splits [(category, month, amount)] into in-place overwrites of
+        budgets already in the sheet, as [{'range', 'values'}] for
+        Worksheet.batch_update, and new [Category, Month-Year, Budget] rows
+        to append. Repeated (category, month) changes keep the last amount.
+        """
+        latest = {}
+        for category, month, amount in changes:
+            latest[(category, month)] = amount
+        updates, new_rows = [], []
+        with self._lock:
+            for (category, month), amount in latest.items():
+                entry = self._rows.get((category, month))
+                if entry:
+                    updates.append({'range': f"C{entry[0]}", 'values': [[amount]]})
+                else:
+                    new_rows.append([category, f"{month % 12 + 1:02d}/{month // 12}", amount])
+        return updates, new_rows
+
+    def apply(self, changes):
+        """
+        Records changes once they are written to the sheet, new rows
+        assumed appended in plan() order.
+        """
+        latest = {}
+        for category, month, amount in changes:
+            latest[(category, month)] = amount
+        with self._lock:
+            for (category, month), amount in latest.items():
+                entry = self._rows.get((category, month))
+                if entry:
+                    self._rows[(category, month)] = (entry[0], _amount(amount))
+                else:
+                    self._rows[(category, month)] = (self.next_row, _amount(amount))
+                    insort(self._months.setdefault(category, []), month)
+                    self.next_row += 1
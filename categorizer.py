@@ -0,0 +1,184 @@
+
+import math
+import re
+from collections import Counter, defaultdict
+
+from sheet_model import DatePartitionedModel
+
+# Pattern lengths learned from history, in description tokens. Longer
+# patterns ("AMAZON PAY", "ZOMATO LTD ORDER") are more specific and weigh more.
+MAX_NGRAM = 3
+# An n-gram becomes a pattern once it has been seen this often, and only
+# if this share of its rows agree on one category.
+MIN_SUPPORT = 2
+MIN_PRECISION = 0.6
+# Suggestions below this share of the votes are dropped.
+MIN_CONFIDENCE = 0.5
+
+_WORD = re.compile(r'[A-Z0-9&]{2,}')
+
+
+def normalize_tokens(description):
+    """
+    Upper-cased description words with reference numbers, VPA handles and
+    single characters removed, so "UPI/SWIGGY/412345678901/Food" and
+    "UPI/SWIGGY/498765432101/Food" give the same tokens.
+    """
+    return tuple(
+        tok for tok in _WORD.findall(str(description).upper())
+        if tok.isalpha() or sum(c.isdigit() for c in tok) * 2 < len(tok)
+    )
+
+
+def _ngrams(tokens):
+    seen = set()
+    for n in range(1, MAX_NGRAM + 1):
+        for i in range(len(tokens) - n + 1):
+            gram = tokens[i:i + n]
+            if gram not in seen:
+                seen.add(gram)
+                yield gram
+
+
+class _Matcher:
+    """
+    Aho-Corasick automaton over description tokens. Every pattern carries a
+    (category, weight) vote; one pass over a description's tokens collects
+    the votes of all patterns it contains.
+    """
+
+    def __init__(self, patterns):
+        # patterns: {token tuple: (category, weight)}
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for tokens, vote in patterns.items():
+            state = 0
+            for tok in tokens:
+                nxt = self.goto[state].get(tok)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][tok] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(vote)
+
+        # Breadth-first fail links; each state's outputs absorb those of its
+        # fail state so matching never has to walk the fail chain for output.
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for tok, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and tok not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(tok, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+                queue.append(nxt)
+
+    def votes(self, tokens):
+        goto, fail, out = self.goto, self.fail, self.out
+        scores = defaultdict(float)
+        state = 0
+        for tok in tokens:
+            while state and tok not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(tok, 0)
+            for category, weight in out[state]:
+                scores[category] += weight
+        return scores
+
+
+class Categorizer(DatePartitionedModel):
+    """
+    Suggests categories for transactions from the categorized rows already in
+    a transactions worksheet. Counts are updated per changed date; the
+    matcher is recompiled lazily on the next suggestion after a change.
+    """
+
+    def __init__(self, records=()):
+        self._exact = defaultdict(Counter)
+        self._grams = defaultdict(Counter)
+        self._matcher = None
+        self._exact_best = None
+        super().__init__(records)
+
+    def _prepare(self, row):
+        category = str(row.get('Category', '')).strip()
+        tokens = normalize_tokens(row.get('Description', ''))
+        return (tokens, category) if category and tokens else None
+
+    def _apply(self, changes):
+        for old, new in changes.values():
+            for tokens, category in old:
+                self._count(tokens, category, -1)
+            for tokens, category in new:
+                self._count(tokens, category, 1)
+        self._matcher = None
+
+    def _count(self, tokens, category, delta):
+        for table, key in [(self._exact, tokens)] + [(self._grams, g) for g in _ngrams(tokens)]:
+            counts = table[key]
+            counts[category] += delta
+            if counts[category] <= 0:
+                del counts[category]
+                if not counts:
+                    del table[key]
+
+    def _compile(self):
+        patterns = {}
+        for gram, counts in self._grams.items():
+            category, n = counts.most_common(1)[0]
+            total = sum(counts.values())
+            precision = n / total
+            if n < MIN_SUPPORT or precision < MIN_PRECISION:
+                continue
+            patterns[gram] = (category, precision * len(gram) * math.log2(1 + n))
+        exact_best = {}
+        for tokens, counts in self._exact.items():
+            category, n = counts.most_common(1)[0]
+            exact_best[tokens] = (category, n / sum(counts.values()))
+        return _Matcher(patterns), exact_best
+
+    def suggest_many(self, descriptions):
+        """
+        Returns one {"category", "confidence"} (or None) per description.
+        Identical normalized descriptions are scored once.
+        """
+        with self._lock:
+            if self._matcher is None:
+                self._matcher, self._exact_best = self._compile()
+            matcher, exact_best = self._matcher, self._exact_best
+
+        memo = {}
+        results = []
+        for desc in descriptions:
+            tokens = normalize_tokens(desc)
+            if tokens not in memo:
+                memo[tokens] = self._suggest(tokens, matcher, exact_best)
+            results.append(memo[tokens])
+        return results
+
+    @staticmethod
+    def _suggest(tokens, matcher, exact_best):
+        if not tokens:
+            return None
+        exact = exact_best.get(tokens)
+        if exact and exact[1] >= MIN_CONFIDENCE:
+            return {"category": exact[0], "confidence": round(exact[1], 3)}
+        scores = matcher.votes(tokens)
+        if not scores:
+            return None
+        category = max(scores, key=scores.get)
+        confidence = scores[category] / sum(scores.values())
+        if confidence < MIN_CONFIDENCE:
+            return None
+        return {"category": category, "confidence": round(confidence, 3)}
+
+    def suggest(self, description):
+        return self.suggest_many([description])[0]
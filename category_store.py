@@ -0,0 +1,98 @@
+
+import hashlib
+import threading
+import time
+
+
+def normalize(name):
+    return str(name or '').strip().lower()
+
+
+class CategoryStore:
+    """
+    In-process copy of the categories worksheet (one name per row in
+    column A), so GET /categories is served from memory.
+
+    Blank rows are kept so each name's position is its sheet row, which lets
+    a removal delete exactly those rows without re-reading the column. Every
+    change bumps `version`; the ETag is derived from the names themselves so
+    it stays valid across restarts and processes.
+    """
+
+    def __init__(self, max_age=None):
+        self.lock = threading.RLock()
+        self.max_age = max_age
+        self.version = 0
+        self._rows = None
+        self._loaded_at = 0.0
+        self._etag = None
+
+    @property
+    def loaded(self):
+        return self._rows is not None
+
+    @property
+    def stale(self):
+        """
+        True until loaded, and again once older than max_age seconds so edits
+        made directly in the sheet are picked up.
+        """
+        with self.lock:
+            if self._rows is None:
+                return True
+            return bool(self.max_age) and time.monotonic() - self._loaded_at > self.max_age
+
+    def _changed(self):
+        self.version += 1
+        self._etag = None
+
+    def load(self, values):
+        with self.lock:
+            self._rows = [normalize(v) for v in values]
+            while self._rows and not self._rows[-1]:
+                self._rows.pop()
+            self._loaded_at = time.monotonic()
+            self._changed()
+
+    def names(self):
+        with self.lock:
+            return [name for name in self._rows or () if name]
+
+    def etag(self):
+        with self.lock:
+            if self._etag is None:
+                digest = hashlib.blake2b('\n'.join(self.names()).encode(), digest_size=8).hexdigest()
+                self._etag = digest
+            return self._etag
+
+    def missing(self, names):
+        """
+        The names (normalized, de-duplicated, in order) not yet in the list.
+        """
+        with self.lock:
+            present = set(self._rows or ())
+        new = []
+        for name in map(normalize, names):
+            if name and name not in present and name not in new:
+                new.append(name)
+        return new
+
+    def rows_of(self, names):
+        """
+        1-based sheet rows holding any of `names`, highest first so they can
+        be deleted in order without shifting the rest.
+        """
+        wanted = {normalize(n) for n in names}
+        with self.lock:
+            return [i + 1 for i in range(len(self._rows or ()) - 1, -1, -1) if self._rows[i] in wanted]
+
+    def appended(self, names):
+        with self.lock:
+            self._rows.extend(names)
+            self._changed()
+
+    def deleted(self, rows):
+        with self.lock:
+            for row in sorted(rows, reverse=True):
+                del self._rows[row - 1]
+            self._changed()
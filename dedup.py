@@ -0,0 +1,145 @@
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime
+
+_SPACES = re.compile(r'\s+')
+
+
+def _norm_date(value):
+    raw = str(value or '').strip()
+    try:
+        return datetime.strptime(raw, "%d/%m/%Y").strftime("%d/%m/%Y")
+    except ValueError:
+        return raw
+
+
+def _norm_amount(value):
+    if isinstance(value, (int, float)):
+        return f"{float(value):.2f}"
+    s = str(value or '').replace(',', '').strip()
+    if not s:
+        return "0.00"
+    try:
+        return f"{float(s):.2f}"
+    except ValueError:
+        return s
+
+
+def fingerprint(t):
+    """
+    Stable 64-bit hex fingerprint of a transaction: normalized date,
+    withdrawal, deposit, balance and description. The running balance makes
+    two genuinely separate, otherwise identical payments on one day distinct,
+    while the same row read from two overlapping statements (or from the
+    sheet, where gspread returns numbers) matches.
+    """
+    key = "\x1f".join((
+        _norm_date(t.get('Date')),
+        _norm_amount(t.get('Withdrawal')),
+        _norm_amount(t.get('Deposit')),
+        _norm_amount(t.get('Balance')),
+        _SPACES.sub(' ', str(t.get('Description', ''))).strip().upper(),
+    ))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def split_duplicates(transactions, known=()):
+    """
+    Single pass over `transactions`: returns (unique, duplicates), where a
+    row is a duplicate if its fingerprint is in `known` or appeared earlier
+    in the list.
+    """
+    seen = set()
+    unique, duplicates = [], []
+    for t in transactions:
+        fp = fingerprint(t)
+        if fp in seen or fp in known:
+            duplicates.append(t)
+        else:
+            seen.add(fp)
+            unique.append(t)
+    return unique, duplicates
+
+
+class FingerprintStore:
+    """
+    Persistent per-account set of fingerprints of synced transactions, so
+    uploads can be checked for duplicates without reading the worksheet.
+    One text file per account with a "fingerprint date" line per row, kept
+    in memory and rewritten atomically on change. The file is re-read when
+    its mtime or size changes, so rows recorded by another worker or process
+    are seen.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._accounts = {}     # account -> ((mtime_ns, size), entries)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, account):
+        return os.path.join(self.directory, account + '.fp')
+
+    def _load(self, account):
+        # Returns {fingerprint: date}, or None if the account was never stored.
+        path = self._path(account)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._accounts.pop(account, None)
+            return None
+        state = (st.st_mtime_ns, st.st_size)
+        cached = self._accounts.get(account)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        try:
+            with open(path) as f:
+                entries = dict(line.rstrip('\n').split(' ', 1) for line in f if line.strip())
+        except OSError:
+            return None
+        self._accounts[account] = (state, entries)
+        return entries
+
+    def _save(self, account, entries):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.writelines(f"{fp} {date}\n" for fp, date in entries.items())
+        path = self._path(account)
+        os.replace(tmp, path)
+        st = os.stat(path)
+        self._accounts[account] = ((st.st_mtime_ns, st.st_size), entries)
+
+    def has_account(self, account):
+        with self._lock:
+            return self._load(account) is not None
+
+    def known(self, account):
+        """
+        The account's fingerprints (empty if it was never stored).
+        """
+        with self._lock:
+            return set(self._load(account) or ())
+
+    def rebuild(self, account, records):
+        """
+        Replaces the account's set from a full read of its worksheet. Only
+        writes to disk if it changed.
+        """
+        entries = {fingerprint(r): _norm_date(r.get('Date')) for r in records}
+        with self._lock:
+            if entries != self._load(account):
+                self._save(account, entries)
+
+    def add(self, account, transactions):
+        """
+        Records appended rows.
+        """
+        with self._lock:
+            entries = dict(self._load(account) or {})
+            for t in transactions:
+                entries[fingerprint(t)] = _norm_date(t.get('Date'))
+            self._save(account, entries)
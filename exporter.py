@@ -0,0 +1,210 @@
+
+import csv
+import gzip
+import io
+from datetime import datetime
+
+from gspread.utils import rowcol_to_a1
+
+# Rows fetched from the worksheet per ranged read, and per output batch
+# (an Arrow record batch / Parquet row group / gzip flush).
+BATCH_ROWS = 2000
+
+SHEET_COLUMNS = ['S No', 'Date', 'Cheque No', 'Description', 'Withdrawal', 'Deposit', 'Balance', 'Category']
+
+# Exported columns. Amounts are integer paise so no precision is lost.
+EXPORT_COLUMNS = ['date', 'serial', 'cheque_no', 'description', 'withdrawal_paise',
+                  'deposit_paise', 'balance_paise', 'category']
+
+FORMATS = {
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrow'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'csv.gz': ('application/gzip', '.csv.gz'),
+}
+
+
+def _paise(value):
+    s = str(value if value is not None else '').replace(',', '').strip()
+    if not s:
+        return None
+    try:
+        return int(round(float(s) * 100))
+    except ValueError:
+        return None
+
+
+def _int(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _date(value):
+    try:
+        return datetime.strptime(str(value).strip(), "%d/%m/%Y").date()
+    except ValueError:
+        return None
+
+
+def read_batches(worksheet, batch_rows=BATCH_ROWS):
+    """
+    Yields the worksheet's data rows as column dicts (EXPORT_COLUMNS ->
+    list of typed values), reading `batch_rows` rows per ranged request
+    instead of the whole sheet at once.
+    """
+    header = worksheet.row_values(1)
+    index = {name: header.index(name) for name in SHEET_COLUMNS if name in header}
+    n_cols = max(len(header), 1)
+
+    def cell(row, name):
+        i = index.get(name)
+        return row[i] if i is not None and i < len(row) else ''
+
+    # Read up to the end of the grid rather than stopping at the first short
+    # or empty batch, so a long run of blank rows can't cut the export off.
+    start = 2
+    while start <= worksheet.row_count:
+        end = start + batch_rows - 1
+        rows = worksheet.get(f"A{start}:{rowcol_to_a1(end, n_cols)}")
+        batch = {name: [] for name in EXPORT_COLUMNS}
+        for row in rows:
+            if not any(str(v).strip() for v in row):
+                continue
+            batch['date'].append(_date(cell(row, 'Date')))
+            batch['serial'].append(_int(cell(row, 'S No')))
+            batch['cheque_no'].append(str(cell(row, 'Cheque No')))
+            batch['description'].append(str(cell(row, 'Description')))
+            batch['withdrawal_paise'].append(_paise(cell(row, 'Withdrawal')) or 0)
+            batch['deposit_paise'].append(_paise(cell(row, 'Deposit')) or 0)
+            batch['balance_paise'].append(_paise(cell(row, 'Balance')))
+            batch['category'].append(str(cell(row, 'Category')).strip())
+        if batch['date']:
+            yield batch
+        start = end + 1
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that collects bytes until drained, so a writer
+    (Arrow, Parquet, gzip) can be streamed out a batch at a time.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('date', pa.date32()),
+        ('serial', pa.int64()),
+        ('cheque_no', pa.string()),
+        ('description', pa.string()),
+        ('withdrawal_paise', pa.int64()),
+        ('deposit_paise', pa.int64()),
+        ('balance_paise', pa.int64()),
+        ('category', pa.dictionary(pa.int32(), pa.string())),
+    ])
+
+
+def require_format(fmt):
+    """
+    Raises ValueError for unknown formats and RuntimeError if the format
+    needs pyarrow and it isn't installed.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    if fmt in ('arrow', 'parquet'):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError(f"The '{fmt}' export format needs pyarrow (pip install pyarrow)")
+
+
+def stream_export(batches, fmt):
+    """
+    Encodes column batches as `fmt` and yields the output bytes piece by
+    piece; only one batch is held in memory at a time.
+    """
+    require_format(fmt)
+    sink = _ChunkSink()
+
+    if fmt == 'csv.gz':
+        with gzip.GzipFile(fileobj=sink, mode='wb') as gz:
+            text = io.TextIOWrapper(gz, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(EXPORT_COLUMNS)
+            for batch in batches:
+                for row in zip(*(batch[name] for name in EXPORT_COLUMNS)):
+                    writer.writerow(['' if v is None else v.isoformat() if i == 0 else v
+                                     for i, v in enumerate(row)])
+                text.flush()
+                yield sink.drain()
+            text.flush()
+            text.detach()
+        yield sink.drain()
+        return
+
+    import pyarrow as pa
+    schema = _arrow_schema()
+    if fmt == 'arrow':
+        writer = pa.ipc.new_stream(sink, schema)
+    else:
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for batch in batches:
+            if fmt == 'arrow':
+                writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=schema))
+            else:
+                writer.write_table(pa.Table.from_pydict(batch, schema=schema))  # one row group
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Export a bank's synced transaction history.")
+    parser.add_argument('output', help='Output file')
+    parser.add_argument('--bank', choices=['ICICI', 'HDFC'], default='ICICI')
+    parser.add_argument('--format', choices=list(FORMATS), default=None,
+                        help='Output format (default: from the output file extension)')
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS)
+    args = parser.parse_args()
+
+    fmt = args.format or next((f for f, (_, ext) in FORMATS.items() if args.output.endswith(ext)), 'csv.gz')
+    require_format(fmt)
+
+    from app import get_gspread_client, SHEET_ID
+    gc = get_gspread_client()
+    if not gc:
+        raise SystemExit("Service account credentials not found")
+    ws_name = "jeyashree_transactions" if args.bank == "HDFC" else "harish_transactions"
+    ws = gc.open_by_key(SHEET_ID).worksheet(ws_name)
+
+    size = 0
+    with open(args.output, 'wb') as f:
+        for chunk in stream_export(read_batches(ws, args.batch_rows), fmt):
+            f.write(chunk)
+            size += len(chunk)
+    print(f"Written {ws_name} to {args.output} ({fmt}, {size} bytes)")
@@ -0,0 +1,111 @@
+
+import calendar
+from datetime import date
+
+import numpy as np
+
+# Past months whose spending pattern informs the projection.
+DEFAULT_HISTORY_MONTHS = 6
+MAX_HISTORY_MONTHS = 120
+
+
+def _month_start(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def forecast_month(store, budget_store, target_month, as_of=None, history=DEFAULT_HISTORY_MONTHS):
+    """
+    Projects month-end spend per category for target_month (a month index)
+    from the analytics store, as of the date `as_of` (default today), against
+    the budgets in force that month from `budget_store`.
+
+    Two projections are combined:
+      - run rate: spend so far scaled to the whole month;
+      - history: spend so far plus what the category spent after the same
+        day of the month, averaged over the previous `history` months with
+        data.
+    `projected` averages the two when there is history, else uses the run
+    rate. Everything is computed for all categories and months in a few
+    bincounts over the store's columns.
+    """
+    as_of = as_of or date.today()
+    start = _month_start(target_month)
+    days_in_month = calendar.monthrange(start.year, start.month)[1]
+    end = start.replace(day=days_in_month)
+    if as_of < start:
+        day = 0
+    elif as_of > end:
+        day = days_in_month
+    else:
+        day = as_of.day
+
+    # Never look back before January of year 1, the first month a date can hold.
+    history = max(0, min(history, MAX_HISTORY_MONTHS, target_month - 12))
+    first = target_month - history
+    cols, categories, _ = store.window(_month_start(first).toordinal(), end.toordinal())
+    n_cat = len(categories)
+    n_month = history + 1
+
+    mi = cols['month'] - first
+    month_starts = np.array([_month_start(first + i).toordinal() for i in range(n_month)])
+    dom = cols['date'] - month_starts[mi] + 1
+    key = mi * n_cat + cols['category']
+    w = cols['withdrawal']
+    total = np.bincount(key, weights=w, minlength=n_month * n_cat).reshape(n_month, n_cat)
+    by_day = np.bincount(key, weights=w * (dom <= day), minlength=n_month * n_cat).reshape(n_month, n_cat)
+
+    spent = by_day[-1]
+    run_rate = spent * days_in_month / day if day else np.zeros(n_cat)
+    past_total, past_by_day = total[:-1], by_day[:-1]
+    months_with_data = past_total.sum(axis=1) > 0
+    n_hist = int(months_with_data.sum())
+    if n_hist:
+        remaining = (past_total - past_by_day)[months_with_data].mean(axis=0)
+        from_history = spent + remaining
+        projected = (run_rate + from_history) / 2 if day else from_history
+    else:
+        from_history = None
+        projected = run_rate
+    if day == days_in_month:
+        # The month is over: every projection is just what was spent.
+        projected = spent
+        if from_history is not None:
+            from_history = spent
+
+    budgets = budget_store.effective_all(target_month)
+    codes = {name: c for c, name in enumerate(categories)}
+    rows = []
+    for cat in sorted(set(categories) | set(budgets)):
+        if not cat:
+            continue
+        c = codes.get(cat)
+        cat_spent = spent[c] / 100 if c is not None else 0.0
+        cat_projected = projected[c] / 100 if c is not None else 0.0
+        if not cat_spent and not cat_projected and cat not in budgets:
+            continue
+        budget = budgets.get(cat)
+        if not budget:
+            status = None
+        elif cat_spent > budget:
+            status = 'over_budget'
+        elif cat_projected > budget:
+            status = 'at_risk'
+        else:
+            status = 'on_track'
+        rows.append({
+            "category": cat,
+            "spent": round(cat_spent, 2),
+            "projected": round(cat_projected, 2),
+            "run_rate_projection": round(run_rate[c] / 100, 2) if c is not None else 0.0,
+            "history_projection": round(from_history[c] / 100, 2) if c is not None and from_history is not None else None,
+            "budget": budget,
+            "status": status,
+        })
+    rows.sort(key=lambda r: r['projected'], reverse=True)
+    return {
+        "month_year": f"{start.month:02d}/{start.year}",
+        "as_of_day": day,
+        "days_in_month": days_in_month,
+        "history_months": n_hist,
+        "categories": rows,
+    }
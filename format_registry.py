@@ -0,0 +1,229 @@
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from metrics import FORMAT_DOCUMENTS_TOTAL, FORMAT_PAGES_TOTAL, FORMAT_ROWS_TOTAL, FORMAT_PAGE_SECONDS, FORMAT_RELOADS_TOTAL
+
+COLUMN_TYPES = ('date', 'amount', 'string')
+MULTILINE_STRATEGIES = ('append_to_previous', 'nearest_neighbor')
+
+
+class FormatError(ValueError):
+    pass
+
+
+def validate_formats(config):
+    """
+    Raises FormatError listing every problem in a bank_formats.json
+    document, so a bad edit is rejected before any statement is parsed
+    with it.
+    """
+    if not isinstance(config, list):
+        raise FormatError("bank formats must be a JSON list")
+    problems = []
+    names = set()
+    for i, fmt in enumerate(config):
+        if not isinstance(fmt, dict):
+            problems.append(f"format #{i + 1}: not an object")
+            continue
+        name = fmt.get('name')
+        where = f"format '{name}'" if name else f"format #{i + 1}"
+        if not isinstance(name, str) or not name.strip():
+            problems.append(f"{where}: missing name")
+        elif name in names:
+            problems.append(f"{where}: duplicate name")
+        else:
+            names.add(name)
+
+        detection = fmt.get('detection', {})
+        markers = detection.get('text_present', []) if isinstance(detection, dict) else None
+        if not isinstance(markers, list) or not all(isinstance(m, str) and m for m in markers):
+            problems.append(f"{where}: detection.text_present must be a list of strings")
+        elif not markers and not detection.get('default'):
+            problems.append(f"{where}: needs detection markers or default: true")
+
+        columns = fmt.get('columns')
+        if not isinstance(columns, list) or not columns:
+            problems.append(f"{where}: no columns")
+            columns = []
+        for col in columns:
+            if not isinstance(col, dict):
+                problems.append(f"{where}: column is not an object")
+                continue
+            cname = col.get('name')
+            if col.get('type') not in COLUMN_TYPES:
+                problems.append(f"{where}: column '{cname}' type must be one of {', '.join(COLUMN_TYPES)}")
+            x_min, x_max = col.get('x_min'), col.get('x_max')
+            if not all(isinstance(x, (int, float)) for x in (x_min, x_max)) or x_min >= x_max:
+                problems.append(f"{where}: column '{cname}' needs numeric x_min < x_max")
+        if columns and not any(isinstance(c, dict) and c.get('type') == 'date' for c in columns):
+            problems.append(f"{where}: no date column")
+
+        exclusions = fmt.get('exclusions', [])
+        if not isinstance(exclusions, list) or not all(isinstance(e, str) for e in exclusions):
+            problems.append(f"{where}: exclusions must be a list of strings")
+        if fmt.get('multiline_strategy', 'append_to_previous') not in MULTILINE_STRATEGIES:
+            problems.append(f"{where}: multiline_strategy must be one of {', '.join(MULTILINE_STRATEGIES)}")
+    if problems:
+        raise FormatError("; ".join(problems))
+
+
+class CompiledFormats:
+    """
+    One immutable version of the format definitions, with the lookups
+    detection needs. An extraction holds on to the version it started with,
+    so a reload never changes formats under an in-flight request.
+    """
+
+    def __init__(self, config, version=None):
+        self.config = config
+        self.version = version
+        self.loaded_at = time.time()
+        # Every detection marker maps to its format so detection is one dict
+        # lookup per word, however many formats are configured. When two
+        # formats share a marker the one listed first wins.
+        self.marker_index = {}
+        for fmt in config:
+            for marker in fmt.get('detection', {}).get('text_present', []):
+                self.marker_index.setdefault(marker, fmt)
+        self.default_format = next((f for f in config if f.get('detection', {}).get('default')), None)
+
+
+class _FormatStats:
+    def __init__(self):
+        self.documents = 0
+        self.pages = 0
+        self.empty_pages = 0
+        self.rows = 0
+        self.parse_seconds = 0.0
+        self.last_used = None
+
+    def as_dict(self):
+        return {
+            "documents": self.documents,
+            "pages": self.pages,
+            "empty_pages": self.empty_pages,
+            "rows": self.rows,
+            "rows_per_page": round(self.rows / self.pages, 2) if self.pages else None,
+            "parse_ms_per_page": round(self.parse_seconds / self.pages * 1000, 3) if self.pages else None,
+            "last_used": self.last_used,
+        }
+
+
+class FormatRegistry:
+    """
+    Bank formats loaded from a JSON file and reloaded when it changes.
+
+    current() checks the file's mtime and size at most every
+    `check_interval` seconds and only re-reads it when they differ; the
+    content hash then decides whether anything really changed. A new
+    version is validated and compiled before it replaces the current one
+    with a single reference swap; an invalid file is logged and the
+    previous version stays in use.
+
+    Per-format parse statistics (documents, pages, rows, parse time) are
+    kept for /formats and exported as metrics.
+    """
+
+    def __init__(self, path, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.last_error = None
+        self._formats = CompiledFormats([])
+        self._file_state = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self.reload()
+        if self.last_error:
+            print(f"Warning: {self.last_error}")
+
+    def current(self):
+        if self.check_interval is not None and time.monotonic() >= self._next_check:
+            self.reload()
+        return self._formats
+
+    def reload(self):
+        """
+        Re-reads the file if it changed on disk. Returns True if a new
+        version was swapped in.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False  # another thread is already checking
+        try:
+            self._next_check = time.monotonic() + (self.check_interval or 0)
+            try:
+                st = os.stat(self.path)
+            except OSError as e:
+                self.last_error = f"Format file not readable: {e}"
+                return False
+            file_state = (st.st_mtime_ns, st.st_size)
+            if file_state == self._file_state:
+                return False
+            self._file_state = file_state
+
+            try:
+                with open(self.path, 'rb') as f:
+                    raw = f.read()
+            except OSError as e:
+                self.last_error = f"Format file not readable: {e}"
+                self._file_state = None  # retry on the next check
+                return False
+            version = hashlib.blake2b(raw, digest_size=8).hexdigest()
+            if version == self._formats.version:
+                return False
+            try:
+                config = json.loads(raw)
+                validate_formats(config)
+            except ValueError as e:
+                self.last_error = f"Rejected {os.path.basename(self.path)} ({version}): {e}"
+                FORMAT_RELOADS_TOTAL.inc(result='rejected')
+                print(self.last_error)
+                return False
+            first = self._formats.version is None
+            self._formats = CompiledFormats(config, version)
+            self.last_error = None
+            if not first:
+                FORMAT_RELOADS_TOTAL.inc(result='ok')
+                print(f"Reloaded bank formats ({version}): {', '.join(f['name'] for f in config)}")
+            return True
+        finally:
+            self._reload_lock.release()
+
+    # --- statistics ---
+
+    def record_page(self, format_name, rows, seconds):
+        FORMAT_PAGES_TOTAL.inc(format=format_name)
+        FORMAT_ROWS_TOTAL.inc(rows, format=format_name)
+        FORMAT_PAGE_SECONDS.observe(seconds, format=format_name)
+        with self._stats_lock:
+            stats = self._stats.setdefault(format_name, _FormatStats())
+            stats.pages += 1
+            stats.rows += rows
+            stats.empty_pages += not rows
+            stats.parse_seconds += seconds
+
+    def record_document(self, format_name):
+        FORMAT_DOCUMENTS_TOTAL.inc(format=format_name)
+        with self._stats_lock:
+            stats = self._stats.setdefault(format_name, _FormatStats())
+            stats.documents += 1
+            stats.last_used = time.time()
+
+    def describe(self):
+        formats = self.current()
+        with self._stats_lock:
+            stats = {name: s.as_dict() for name, s in self._stats.items()}
+        return {
+            "version": formats.version,
+            "loaded_at": formats.loaded_at,
+            "last_error": self.last_error,
+            "formats": [dict(name=f['name'], default=bool(f.get('detection', {}).get('default')),
+                             columns=[c['name'] for c in f['columns']],
+                             stats=stats.get(f['name'], _FormatStats().as_dict()))
+                        for f in formats.config],
+        }
@@ -19,6 +19,7 @@ function App() {
   const [dateStatus, setDateStatus] = useState({})
   // Existing categories map
   const [existingCategories, setExistingCategories] = useState({})
+  const [suggestedCategories, setSuggestedCategories] = useState({})
 
   // Categories state
   const [categories, setCategories] = useState([])
@@ -90,6 +91,7 @@ function App() {
     setBankName('')
     setDateStatus({})
     setExistingCategories({})
+    setSuggestedCategories({})
     setPassword('')
     setShowPasswordModal(false)
   }
@@ -104,6 +106,7 @@ function App() {
       if (resp.data.dates) {
         setDateStatus(resp.data.dates)
         setExistingCategories(resp.data.categories || {})
+        setSuggestedCategories(resp.data.suggestions || {})
       } else {
         // Fallback for older response format if any
         setDateStatus(resp.data)
@@ -172,7 +175,7 @@ function App() {
       const dep = norm(t.Deposit)
 
       const sig = `${d}_${desc}_${w}_${dep}`
-      const prefilledCat = existingCategories[sig] || ''
+      const prefilledCat = existingCategories[sig] || suggestedCategories[sig] || ''
 
       return { ...t, Category: t.Category || prefilledCat }
     })
@@ -263,6 +263,8 @@ export default function Dashboard({ bank }) {
                             {item.budget ? (
                               item.amount > item.budget ? (
                                 <span style={{ color: '#ef4444', fontWeight: 'bold' }}>Over Budget (₹{(item.amount - item.budget).toFixed(2)})</span>
+                              ) : item.forecast_status === 'at_risk' ? (
+                                <span style={{ color: '#f59e0b', fontWeight: 'bold' }}>On track to exceed (₹{item.projected.toFixed(2)} projected)</span>
                               ) : (
                                 <span style={{ color: '#10b981', fontWeight: 'bold' }}>Within Budget</span>
                               )
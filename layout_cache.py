@@ -0,0 +1,175 @@
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from metrics import record_cache
+
+# File layout (little endian):
+#   header:   magic b'LYT1', page_count (uint32)
+#   per page: present (uint8), height (float32), word_count (uint32)
+#             then, if present: x0[n], x1[n], top[n] as float32,
+#             text_len[n] as uint32, and the UTF-8 text of all words
+# float32 keeps coordinates to well under a hundredth of a point, far finer
+# than the column ranges and the 3pt line grouping in the parser.
+MAGIC = b'LYT1'
+_HEADER = struct.Struct('<4sI')
+_PAGE = struct.Struct('<BfI')
+
+
+class PageLayout:
+    """
+    Compact, array-backed words of one page: just what _parse_words needs.
+    """
+    __slots__ = ('height', 'x0', 'x1', 'top', 'texts')
+
+    def __init__(self, height, x0, x1, top, texts):
+        self.height = height
+        self.x0 = x0
+        self.x1 = x1
+        self.top = top
+        self.texts = texts
+
+    @classmethod
+    def from_words(cls, words, height):
+        return cls(
+            height,
+            array('f', (w['x0'] for w in words)),
+            array('f', (w['x1'] for w in words)),
+            array('f', (w['top'] for w in words)),
+            [w['text'] for w in words],
+        )
+
+    def words(self):
+        return [
+            {'text': t, 'x0': x0, 'x1': x1, 'top': top}
+            for t, x0, x1, top in zip(self.texts, self.x0, self.x1, self.top)
+        ]
+
+
+class DocumentLayout:
+    """
+    Per-page layouts of one PDF. Pages that were never extracted (e.g. skipped
+    by a date-range extraction) are None and get filled in on a later run.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    def has_page(self, idx):
+        return self.pages[idx] is not None
+
+    def is_complete(self):
+        return all(p is not None for p in self.pages)
+
+    def to_bytes(self):
+        out = bytearray(_HEADER.pack(MAGIC, len(self.pages)))
+        for page in self.pages:
+            if page is None:
+                out += _PAGE.pack(0, 0.0, 0)
+                continue
+            encoded = [t.encode('utf-8') for t in page.texts]
+            out += _PAGE.pack(1, page.height, len(encoded))
+            out += page.x0.tobytes() + page.x1.tobytes() + page.top.tobytes()
+            out += array('I', (len(b) for b in encoded)).tobytes()
+            out += b''.join(encoded)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, page_count = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a layout cache file")
+        pos = _HEADER.size
+        pages = []
+        for _ in range(page_count):
+            present, height, n = _PAGE.unpack_from(data, pos)
+            pos += _PAGE.size
+            if not present:
+                pages.append(None)
+                continue
+            arrays = []
+            for code in ('f', 'f', 'f', 'I'):
+                a = array(code)
+                a.frombytes(data[pos:pos + n * a.itemsize])
+                pos += n * a.itemsize
+                arrays.append(a)
+            texts = []
+            for length in arrays[3]:
+                texts.append(data[pos:pos + length].decode('utf-8'))
+                pos += length
+            pages.append(PageLayout(height, arrays[0], arrays[1], arrays[2], texts))
+        return cls(pages)
+
+
+class LayoutCache:
+    """
+    On-disk cache of per-page word layouts keyed by PDF content hash, so a
+    statement can be re-parsed (e.g. after editing bank_formats.json) without
+    pdfminer re-laying out every page. Least recently used entries are evicted
+    once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key_for(self, pdf_path, password=None):
+        # The password is part of the key so an encrypted statement's layout
+        # is only served to callers that could have decrypted it themselves.
+        h = hashlib.sha256()
+        with open(pdf_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+        if password:
+            h.update(b'\0' + password.encode('utf-8'))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.layout')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                layout = DocumentLayout.from_bytes(f.read())
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, ValueError, struct.error):
+            record_cache('layout', False)
+            return None
+        record_cache('layout', True)
+        return layout
+
+    def put(self, key, layout):
+        data = layout.to_bytes()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.layout'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+            entries.sort()
+            while total > self.max_bytes and len(entries) > 1:
+                _, size, path = entries.pop(0)
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    pass
@@ -0,0 +1,213 @@
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, wide enough to cover a single word extraction
+# up to a multi-hundred-page statement.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for k, v in pairs:
+        v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{k}="{v}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, val in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(val)}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        """
+        Returns (count, sum) for one label combination.
+        """
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        series = self._series.get(key)
+        if not series:
+            return 0, 0.0
+        return series[-1], series[-2]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            for i, bound in enumerate(self.buckets):
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {series[i]}")
+            labels = _format_labels(self.labelnames, key, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+def render_all():
+    """
+    Renders every registered metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Metrics shared across the app ---
+
+EXTRACT_STAGE_SECONDS = Histogram(
+    'extract_stage_seconds',
+    'Time spent in each PDF extraction stage (pdf_open, detect_format, extract_words, parse_page).',
+    ['stage'])
+
+FORMAT_DOCUMENTS_TOTAL = Counter(
+    'format_documents_total',
+    'Statements parsed, by detected bank format.',
+    ['format'])
+
+FORMAT_PAGES_TOTAL = Counter(
+    'format_pages_total',
+    'Statement pages parsed, by bank format.',
+    ['format'])
+
+FORMAT_ROWS_TOTAL = Counter(
+    'format_rows_total',
+    'Transactions parsed, by bank format.',
+    ['format'])
+
+FORMAT_PAGE_SECONDS = Histogram(
+    'format_page_parse_seconds',
+    'Time to parse one page\'s words into transactions, by bank format.',
+    ['format'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+FORMAT_RELOADS_TOTAL = Counter(
+    'format_reloads_total',
+    'Reloads of bank_formats.json by result (ok or rejected).',
+    ['result'])
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds',
+    'Latency of HTTP requests by endpoint.',
+    ['endpoint', 'method', 'status'])
+
+SHEETS_CALLS_TOTAL = Counter(
+    'sheets_api_calls_total',
+    'Google Sheets API calls by operation and outcome.',
+    ['operation', 'status'])
+
+SHEETS_CALL_SECONDS = Histogram(
+    'sheets_api_call_duration_seconds',
+    'Latency of Google Sheets API calls by operation.',
+    ['operation'])
+
+SHEETS_CIRCUIT_STATE = Gauge(
+    'sheets_circuit_state',
+    'Google Sheets circuit breaker state: 0 closed, 1 half-open, 2 open.')
+
+CACHE_REQUESTS_TOTAL = Counter(
+    'cache_requests_total',
+    'Cache lookups by cache name and result (hit or miss).',
+    ['cache', 'result'])
+
+CACHE_HIT_RATIO = Gauge(
+    'cache_hit_ratio',
+    'Fraction of lookups served from cache since process start.',
+    ['cache'])
+
+
+def stage_timer(stage):
+    return EXTRACT_STAGE_SECONDS.time(stage=stage)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS_TOTAL.inc(cache=cache, result='hit' if hit else 'miss')
+    hits = CACHE_REQUESTS_TOTAL.value(cache=cache, result='hit')
+    misses = CACHE_REQUESTS_TOTAL.value(cache=cache, result='miss')
+    CACHE_HIT_RATIO.set(hits / (hits + misses), cache=cache)
@@ -0,0 +1,74 @@
+
+import json
+import os
+
+from pdfminer.pdfdocument import PDFDocument, PDFPasswordIncorrect
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import int_value
+
+
+def load_keyring(path):
+    """
+    Reads a per-bank password file: {"HDFC": ["pw", ...], "ICICI": "pw"}.
+    Returns {bank: [passwords]}; an empty dict if path is unset or missing.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    return {bank: [pw] if isinstance(pw, str) else list(pw) for bank, pw in data.items()}
+
+
+def candidate_passwords(keyring, supplied=None, bank_hint=None):
+    """
+    Orders passwords to try: the one the user typed, the empty user password
+    (common for permission-only encryption), then the hinted bank's keyring
+    entries before everyone else's. Duplicates are dropped.
+    """
+    ordered = [supplied, '']
+    if bank_hint in keyring:
+        ordered += keyring[bank_hint]
+    for bank, passwords in keyring.items():
+        if bank != bank_hint:
+            ordered += passwords
+    seen = set()
+    result = []
+    for pw in ordered:
+        if pw is None or pw in seen:
+            continue
+        seen.add(pw)
+        result.append(pw)
+    return result
+
+
+class _EncryptionProbe(PDFDocument):
+    # Reads the xref and trailer like PDFDocument but only records the
+    # encryption dictionary instead of deriving a key from a password.
+    def _initialize_password(self, password=''):
+        pass
+
+
+def probe_password(pdf_path, candidates):
+    """
+    Returns the first candidate that unlocks pdf_path, or None if the PDF is
+    not encrypted. Raises PDFPasswordIncorrect if no candidate matches.
+
+    Each check only runs the standard security handler against the
+    /Encrypt dictionary; the xref is read once and no page is laid out.
+    """
+    with open(pdf_path, 'rb') as f:
+        doc = _EncryptionProbe(PDFParser(f))
+        if doc.encryption is None:
+            return None
+        docid, param = doc.encryption
+        factory = PDFDocument.security_handler_registry.get(int_value(param.get('V', 0)))
+        if factory is None:
+            # Unknown scheme: let the full open report the real error.
+            return candidates[0] if candidates else None
+        for password in candidates:
+            try:
+                factory(docid, param, password)
+                return password
+            except PDFPasswordIncorrect:
+                continue
+    raise PDFPasswordIncorrect()
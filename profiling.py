@@ -0,0 +1,159 @@
+
+import cProfile
+import collections
+import functools
+import glob
+import hmac
+import os
+import sys
+import threading
+import time
+from flask import request, make_response
+
+# Profiling is opt-in. With PROFILING_ENABLED unset none of this runs and the
+# wrapped endpoints behave exactly as before.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILING_ADMIN_TOKEN = os.environ.get("PROFILING_ADMIN_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+# Requests slower than this are captured automatically (0 disables).
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "0") or 0)
+# Ring buffer size: oldest captures are deleted once this many are kept.
+PROFILE_MAX_KEPT = int(os.environ.get("PROFILE_MAX_KEPT", "20"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread at a fixed interval and counts
+    identical stacks, which is exactly the collapsed-stack format consumed by
+    flamegraph.pl / speedscope ("frame;frame;frame count").
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.counts[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileStore:
+    """
+    Keeps at most `max_kept` captures on disk, deleting the oldest first.
+    Each capture is a set of files sharing a prefix (.collapsed and, for
+    on-demand runs, .pstats).
+    """
+
+    def __init__(self, directory, max_kept):
+        self.directory = directory
+        self.max_kept = max(1, max_kept)
+        self._lock = threading.Lock()
+        self._captures = collections.deque()
+        if os.path.isdir(directory):
+            # Seed from a previous run so restarts don't leak old captures.
+            prefixes = {os.path.splitext(p)[0] for p in glob.glob(os.path.join(directory, "*.collapsed"))}
+            for prefix in sorted(prefixes, key=lambda p: os.path.getmtime(p + ".collapsed")):
+                self._captures.append(prefix)
+
+    def new_prefix(self, endpoint, elapsed_ms, reason):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        name = f"{stamp}-{int(time.time() * 1000) % 1000:03d}_{endpoint}_{reason}_{int(elapsed_ms)}ms"
+        return os.path.join(self.directory, name)
+
+    def commit(self, prefix):
+        with self._lock:
+            self._captures.append(prefix)
+            while len(self._captures) > self.max_kept:
+                old = self._captures.popleft()
+                for path in glob.glob(glob.escape(old) + ".*"):
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+
+
+_store = ProfileStore(PROFILE_DIR, PROFILE_MAX_KEPT)
+
+
+def _token_ok():
+    supplied = request.headers.get(PROFILE_TOKEN_HEADER, "")
+    return bool(PROFILING_ADMIN_TOKEN) and bool(supplied) and hmac.compare_digest(supplied, PROFILING_ADMIN_TOKEN)
+
+
+def profiled(fn):
+    """
+    Wraps a Flask view so a single request can be profiled on demand (admin
+    token in the X-Profile-Token header -> cProfile + stack sampler), and so
+    requests slower than PROFILE_SLOW_MS are captured by the sampler alone.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not PROFILING_ENABLED:
+            return fn(*args, **kwargs)
+
+        on_demand = _token_ok()
+        if not on_demand and PROFILE_SLOW_MS <= 0:
+            return fn(*args, **kwargs)
+
+        sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000.0).start()
+        profiler = cProfile.Profile() if on_demand else None
+        start = time.perf_counter()
+        try:
+            if profiler:
+                response = profiler.runcall(fn, *args, **kwargs)
+            else:
+                response = fn(*args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            sampler.stop()
+
+        if not on_demand and elapsed_ms < PROFILE_SLOW_MS:
+            return response
+
+        prefix = _store.new_prefix(fn.__name__, elapsed_ms, "ondemand" if on_demand else "slow")
+        try:
+            sampler.write_collapsed(prefix + ".collapsed")
+            if profiler:
+                profiler.dump_stats(prefix + ".pstats")
+            _store.commit(prefix)
+            print(f"Saved profile {prefix} ({elapsed_ms:.0f} ms)")
+        except OSError as e:
+            print(f"Failed to save profile {prefix}: {e}")
+            return response
+
+        if on_demand:
+            # Let the caller know where the capture landed.
+            response = make_response(response)
+            response.headers["X-Profile-Id"] = os.path.basename(prefix)
+        return response
+
+    return wrapper
@@ -0,0 +1,170 @@
+
+import re
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime
+
+from sheet_model import DatePartitionedModel
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text).lower())
+
+
+def parse_query(q):
+    """
+    Splits a query into (exact tokens, prefixes). A term ending in '*' is a
+    prefix ("swig*"); any other term must match a whole word.
+    """
+    exact, prefixes = [], []
+    for term in str(q or '').lower().split():
+        if term.endswith('*'):
+            prefixes += tokenize(term[:-1])[-1:]
+            exact += tokenize(term[:-1])[:-1]
+        else:
+            exact += tokenize(term)
+    return exact, prefixes
+
+
+def _date_ordinal(value):
+    try:
+        return datetime.strptime(str(value).strip(), "%d/%m/%Y").toordinal()
+    except ValueError:
+        return None
+
+
+def _amount(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    s = str(value or '').replace(',', '').strip()
+    try:
+        return float(s) if s else 0.0
+    except ValueError:
+        return 0.0
+
+
+class SearchIndex(DatePartitionedModel):
+    """
+    Inverted index over one transactions worksheet. Description words map to
+    ascending lists of row ids; a sorted vocabulary answers prefix queries by
+    bisection, and per-date and per-category id lists let filter-only queries
+    skip unrelated rows.
+
+    Rows of a changed date are only marked dead and re-added under new ids;
+    the index is rebuilt from live rows once dead ones outnumber them.
+    """
+
+    def __init__(self, records=()):
+        self._reset()
+        super().__init__(records)
+
+    def _reset(self):
+        self._rows = []          # id -> row dict, None once replaced
+        self._dates = []         # id -> date ordinal (or None)
+        self._amounts = []       # id -> withdrawal or deposit amount
+        self._postings = defaultdict(list)
+        self._by_category = defaultdict(list)
+        self._by_date = defaultdict(list)
+        self._date_keys = []     # sorted ordinals present in _by_date
+        self._vocab = None       # sorted tokens, rebuilt lazily
+        self._ids_by_date = {}   # date string -> ids
+        self._dead = 0
+
+    # --- maintenance ---
+
+    def _add_row(self, row):
+        doc_id = len(self._rows)
+        self._rows.append(row)
+        ordinal = _date_ordinal(row.get('Date', ''))
+        self._dates.append(ordinal)
+        self._amounts.append(max(_amount(row.get('Withdrawal')), _amount(row.get('Deposit'))))
+        for token in set(tokenize(row.get('Description', ''))):
+            if token not in self._postings:
+                self._vocab = None
+            self._postings[token].append(doc_id)
+        self._by_category[str(row.get('Category', '')).strip().lower()].append(doc_id)
+        if ordinal is not None:
+            if ordinal not in self._by_date:
+                insort(self._date_keys, ordinal)
+            self._by_date[ordinal].append(doc_id)
+        return doc_id
+
+    def _apply(self, changes):
+        for date, (_, rows) in changes.items():
+            for doc_id in self._ids_by_date.pop(date, ()):
+                self._rows[doc_id] = None
+                self._dead += 1
+            if rows:
+                self._ids_by_date[date] = [self._add_row(r) for r in rows]
+        if self._dead > len(self._rows) - self._dead:
+            self._reset()
+            for date, rows in self._items_by_date.items():
+                self._ids_by_date[date] = [self._add_row(r) for r in rows]
+
+    # --- queries ---
+
+    def rows(self):
+        """
+        The live rows, as read from the sheet.
+        """
+        with self._lock:
+            return [row for rows in self._items_by_date.values() for row in rows]
+
+    def _prefix_ids(self, prefix):
+        if self._vocab is None:
+            self._vocab = sorted(self._postings)
+        ids = set()
+        i = bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            ids.update(self._postings[self._vocab[i]])
+            i += 1
+        return ids
+
+    def search(self, q=None, from_ordinal=None, to_ordinal=None,
+               min_amount=None, max_amount=None, category=None):
+        """
+        Returns (date ordinal, row) for matching rows, newest first. All query
+        terms and filters must match. Rows without a valid date sort last.
+        """
+        with self._lock:
+            exact, prefixes = parse_query(q)
+            candidate_sets = [set(self._postings.get(t, ())) for t in exact]
+            candidate_sets += [self._prefix_ids(p) for p in prefixes]
+            by_category = self._by_category.get(category.strip().lower(), ()) if category else None
+
+            if candidate_sets:
+                if by_category is not None:
+                    candidate_sets.append(set(by_category))
+                candidate_sets.sort(key=len)
+                ids = candidate_sets[0].intersection(*candidate_sets[1:])
+            elif by_category is not None:
+                # Filter-only query with a category: start from its postings.
+                ids = by_category
+            elif from_ordinal is not None or to_ordinal is not None:
+                # Filter-only query: walk just the dates in range.
+                lo = bisect_left(self._date_keys, from_ordinal) if from_ordinal is not None else 0
+                hi = bisect_right(self._date_keys, to_ordinal) if to_ordinal is not None else len(self._date_keys)
+                ids = [i for d in self._date_keys[lo:hi] for i in self._by_date[d]]
+            else:
+                ids = range(len(self._rows))
+
+            rows, dates, amounts = self._rows, self._dates, self._amounts
+            matched = []
+            for i in ids:
+                if rows[i] is None:
+                    continue
+                d = dates[i]
+                if from_ordinal is not None and (d is None or d < from_ordinal):
+                    continue
+                if to_ordinal is not None and (d is None or d > to_ordinal):
+                    continue
+                if min_amount is not None and amounts[i] < min_amount:
+                    continue
+                if max_amount is not None and amounts[i] > max_amount:
+                    continue
+                matched.append(i)
+            matched.sort(key=lambda i: (dates[i] or 0, i), reverse=True)
+            return [(dates[i] or 0, rows[i]) for i in matched]
+
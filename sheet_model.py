@@ -0,0 +1,84 @@
+
+import threading
+from collections import defaultdict
+
+
+class DatePartitionedModel:
+    """
+    Base for in-memory models built from a transactions worksheet
+    (categorizer, search index, analytics store).
+
+    Rows are held per date, mirroring how /sync rewrites whole dates, so a
+    change only re-processes the dates whose rows differ. Subclasses turn a
+    sheet row into the item they keep with _prepare(row) (None to skip it)
+    and implement _apply(changes), called under the model's lock with
+    {date: (old_items, new_items)}.
+    """
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        self._items_by_date = {}
+        self.refresh(records)
+
+    def _prepare(self, row):
+        return dict(row)
+
+    def _apply(self, changes):
+        raise NotImplementedError
+
+    def _group(self, records):
+        by_date = defaultdict(list)
+        for r in records:
+            item = self._prepare(r)
+            if item is not None:
+                by_date[str(r.get('Date', '')).strip()].append(item)
+        return by_date
+
+    def _set_dates(self, by_date):
+        changes = {}
+        for date, items in by_date.items():
+            old = self._items_by_date.get(date, [])
+            if old == items:
+                continue
+            changes[date] = (old, items)
+            if items:
+                self._items_by_date[date] = items
+            else:
+                self._items_by_date.pop(date, None)
+        if changes:
+            self._apply(changes)
+        return bool(changes)
+
+    def refresh(self, records):
+        """
+        Brings the model in line with a full read of the worksheet.
+        """
+        by_date = self._group(records)
+        with self._lock:
+            for date in self._items_by_date:
+                by_date.setdefault(date, [])
+            return self._set_dates(by_date)
+
+    def update(self, records, replace_dates=()):
+        """
+        Applies a /sync: rows on `replace_dates` are replaced by `records`.
+        """
+        by_date = self._group(records)
+        with self._lock:
+            for date in replace_dates:
+                by_date.setdefault(str(date).strip(), [])
+            return self._set_dates(by_date)
+
+    def add(self, records):
+        """
+        Applies appended rows without touching the rest of their dates.
+        """
+        by_date = self._group(records)
+        with self._lock:
+            return self._set_dates({
+                date: self._items_by_date.get(date, []) + items for date, items in by_date.items()
+            })
+
+    @property
+    def row_count(self):
+        return sum(len(items) for items in self._items_by_date.values())
@@ -0,0 +1,197 @@
+
+import threading
+import time
+import google.auth.exceptions
+import gspread
+import requests
+from metrics import SHEETS_CALLS_TOTAL, SHEETS_CALL_SECONDS, SHEETS_CIRCUIT_STATE
+
+# Seconds a single Sheets API call may take before it is abandoned.
+DEFAULT_TIMEOUT = 10.0
+
+# gspread objects whose method calls hit the Sheets API. Anything they return
+# that is itself one of these gets wrapped too, so `gc.open_by_key(...).worksheet(...)`
+# is instrumented end to end without touching the call sites.
+_WRAPPED_TYPES = [gspread.Client, gspread.Spreadsheet, gspread.Worksheet]
+
+
+def register_type(cls):
+    """
+    Treats `cls` like a gspread object (e.g. the local fake backend used for
+    load testing) so calls through it are instrumented the same way.
+    """
+    if cls not in _WRAPPED_TYPES:
+        _WRAPPED_TYPES.append(cls)
+    return cls
+
+
+class SheetsUnavailable(RuntimeError):
+    """
+    Google Sheets is timing out, throttling or failing, or the circuit
+    breaker is open after such failures. `retry_after` is a hint in seconds.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fails Sheets calls fast once `failure_threshold` calls in a row have
+    failed, instead of letting every request wait out its own timeout.
+    After `reset_timeout` seconds one call is let through as a probe: if it
+    succeeds the circuit closes, otherwise it stays open for another period.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return self.CLOSED
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self.OPEN
+
+    def before_call(self):
+        """
+        Raises SheetsUnavailable if the call should not be attempted.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_timeout or self._probing:
+                raise SheetsUnavailable("Google Sheets is unavailable (circuit open)",
+                                        retry_after=max(1, round(self.reset_timeout - waited)))
+            self._probing = True
+        SHEETS_CIRCUIT_STATE.set(1)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+        SHEETS_CIRCUIT_STATE.set(0)
+
+    def release(self):
+        """
+        Ends a probe that failed for a reason unrelated to Sheets' health.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+            opened = self._opened_at is not None
+        SHEETS_CIRCUIT_STATE.set(2 if opened else 0)
+
+
+breaker = CircuitBreaker()
+_timeout = DEFAULT_TIMEOUT
+
+
+def configure(timeout=None, failure_threshold=None, reset_timeout=None):
+    global _timeout
+    if timeout is not None:
+        _timeout = timeout
+    if failure_threshold is not None:
+        breaker.failure_threshold = failure_threshold
+    if reset_timeout is not None:
+        breaker.reset_timeout = reset_timeout
+
+
+def _is_transient(error):
+    """
+    Whether an APIError means Sheets is degraded (throttled or failing)
+    rather than that the request itself was wrong.
+    """
+    code = getattr(error, 'code', None)
+    return code == 429 or (isinstance(code, int) and code >= 500)
+
+
+class InstrumentedSheets:
+    """
+    Thin proxy around a gspread Client/Spreadsheet/Worksheet that records
+    the count and latency of every method call, labelled by method name.
+    """
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            try:
+                breaker.before_call()
+            except SheetsUnavailable:
+                SHEETS_CALLS_TOTAL.inc(operation=name, status='circuit_open')
+                raise
+            start = time.perf_counter()
+            status = 'ok'
+            try:
+                result = attr(*args, **kwargs)
+                breaker.record_success()
+                return wrap(result)
+            except gspread.WorksheetNotFound:
+                status = 'not_found'
+                breaker.record_success()
+                raise
+            except gspread.exceptions.APIError as e:
+                status = str(getattr(e, 'code', 'api_error'))
+                if not _is_transient(e):
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                raise SheetsUnavailable(f"Google Sheets error {status} during {name}",
+                                        retry_after=round(breaker.reset_timeout)) from e
+            except (requests.exceptions.RequestException, google.auth.exceptions.TransportError) as e:
+                status = 'timeout' if isinstance(e, requests.exceptions.Timeout) else 'connection_error'
+                breaker.record_failure()
+                raise SheetsUnavailable(f"Google Sheets {status.replace('_', ' ')} during {name}",
+                                        retry_after=round(breaker.reset_timeout)) from e
+            except Exception:
+                status = 'error'
+                breaker.release()
+                raise
+            finally:
+                SHEETS_CALL_SECONDS.observe(time.perf_counter() - start, operation=name)
+                SHEETS_CALLS_TOTAL.inc(operation=name, status=status)
+
+        return call
+
+    def __repr__(self):
+        return f"InstrumentedSheets({self._target!r})"
+
+
+def connect(client):
+    """
+    Applies the per-call timeout to a gspread client (or a registered
+    stand-in) and wraps it, so every Sheets call made through it is
+    instrumented, bounded in time and guarded by the circuit breaker.
+    """
+    client.set_timeout(_timeout)
+    return wrap(client)
+
+
+def wrap(obj):
+    if isinstance(obj, tuple(_WRAPPED_TYPES)):
+        return InstrumentedSheets(obj)
+    return obj
@@ -0,0 +1,68 @@
+import pytest
+
+import app as app_module
+from budget_store import month_index
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def no_client():
+        raise AssertionError("an invalid request must not reach Sheets")
+    monkeypatch.setattr(app_module, 'get_gspread_client', no_client)
+    return app_module.app.test_client()
+
+
+def test_parse_budget_changes():
+    changes = app_module.parse_budget_changes([
+        {'category': ' Food ', 'month_year': '01/2026', 'amount': '1,500'},
+    ])
+    assert changes == [('Food', month_index('01/2026'), 1500)]
+
+
+@pytest.mark.parametrize("items", [
+    None,
+    "x",
+    {"category": "Food"},
+    ["x"],
+    [1],
+    [{"month_year": "01/2026", "amount": 1}],
+    [{"category": "Food", "amount": 1}],
+    [{"category": "Food", "month_year": "13/2026", "amount": 1}],
+    [{"category": "Food", "month_year": "01/2026"}],
+    [{"category": "Food", "month_year": "01/2026", "amount": "lots"}],
+    [{"category": "Food", "month_year": "01/2026", "amount": -5}],
+])
+def test_parse_budget_changes_rejects(items):
+    with pytest.raises(ValueError):
+        app_module.parse_budget_changes(items)
+
+
+@pytest.mark.parametrize("body", [
+    {"budgets": ["x"]},
+    {"budgets": [1]},
+    {"budgets": "x"},
+    {},
+    [1],
+    {"budgets": [{"category": "Food", "month_year": "01/2026", "amount": None}]},
+])
+def test_post_budgets_rejects_malformed_bodies(client, body):
+    r = client.post('/budgets', json=body)
+    assert r.status_code == 400
+    assert 'error' in r.get_json()
+
+
+@pytest.mark.parametrize("body", [
+    ["x"],
+    {"category": "Food", "month_year": "01/2026", "amount": "abc"},
+    {"category": "Food", "month_year": "1/2026/3", "amount": 1},
+])
+def test_post_budget_rejects_malformed_bodies(client, body):
+    r = client.post('/budget', json=body)
+    assert r.status_code == 400
+    assert 'error' in r.get_json()
+
+
+def test_bank_worksheets():
+    assert app_module.bank_worksheets('HDFC') == ('jeyashree_transactions', 'jeyashree_budgets')
+    assert app_module.bank_worksheets('ICICI') == ('harish_transactions', 'harish_budgets')
+    assert app_module.bank_worksheets('SBI') == ('harish_transactions', 'harish_budgets')
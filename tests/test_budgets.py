@@ -0,0 +1,63 @@
+import pytest
+
+from budget_store import BudgetStore, month_index, parse_amount
+
+
+def records():
+    return [
+        {'Category': 'Food', 'Month-Year': '01/2026', 'Budget': 5000},
+        {'Category': 'Food', 'Month-Year': '04/2026', 'Budget': '6,000'},
+        {'Category': 'Rent', 'Month-Year': '02/2026', 'Budget': 20000},
+        {'Category': 'Bad', 'Month-Year': '13/2026', 'Budget': 1},
+    ]
+
+
+def test_month_index():
+    assert month_index('01/2026') == 2026 * 12
+    assert month_index(' 12/2026 ') == 2026 * 12 + 11
+
+
+@pytest.mark.parametrize("value", ['', None, '2026', '00/2026', '13/2026', '01/0000', '01/10000', 'ab/cdef', '1/2/2026'])
+def test_month_index_rejects(value):
+    with pytest.raises(ValueError):
+        month_index(value)
+
+
+@pytest.mark.parametrize("value, expected", [(1500, 1500), (12.5, 12.5), ('1,500', 1500), ('99.5', 99.5), (0, 0)])
+def test_parse_amount(value, expected):
+    assert parse_amount(value) == expected
+
+
+@pytest.mark.parametrize("value", [None, '', 'abc', -1, True, float('nan'), float('inf'), [1], {}])
+def test_parse_amount_rejects(value):
+    with pytest.raises(ValueError):
+        parse_amount(value)
+
+
+def test_effective_budget_carries_forward():
+    store = BudgetStore(records())
+    assert store.categories == ['Food', 'Rent']
+    assert store.effective('Food', month_index('12/2025')) is None
+    assert store.effective('Food', month_index('01/2026')) == 5000
+    assert store.effective('Food', month_index('03/2026')) == 5000
+    assert store.effective('Food', month_index('04/2026')) == 6000
+    assert store.effective('Food', month_index('01/2030')) == 6000
+    assert store.effective_all(month_index('01/2026')) == {'Food': 5000}
+    assert store.effective_all(month_index('02/2026')) == {'Food': 5000, 'Rent': 20000}
+
+
+def test_plan_splits_overwrites_and_appends():
+    store = BudgetStore(records())
+    changes = [
+        ('Food', month_index('04/2026'), 100),
+        ('Rent', month_index('03/2026'), 1),
+        ('Rent', month_index('03/2026'), 21000),
+    ]
+    updates, new_rows = store.plan(changes)
+    assert updates == [{'range': 'C3', 'values': [[100]]}]
+    assert new_rows == [['Rent', '03/2026', 21000]]
+
+    store.apply(changes)
+    assert store.effective('Food', month_index('05/2026')) == 100
+    assert store.effective('Rent', month_index('03/2026')) == 21000
+    assert store.next_row == 7
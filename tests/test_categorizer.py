@@ -0,0 +1,35 @@
+from categorizer import Categorizer, _Matcher, normalize_tokens
+
+
+def test_normalize_tokens_drops_reference_numbers():
+    assert normalize_tokens("UPI/SWIGGY/412345678901/Food") == normalize_tokens("UPI/SWIGGY/498765432101/Food")
+    assert normalize_tokens("NEFT-ACME LTD-X") == ('NEFT', 'ACME', 'LTD')
+
+
+def test_matcher_collects_overlapping_patterns():
+    matcher = _Matcher({
+        ('AMAZON',): ('Shopping', 1.0),
+        ('AMAZON', 'PAY'): ('Bills', 2.0),
+        ('PAY', 'BILL'): ('Bills', 1.5),
+    })
+    assert dict(matcher.votes(('UPI', 'AMAZON', 'PAY', 'BILL'))) == {'Shopping': 1.0, 'Bills': 3.5}
+    assert dict(matcher.votes(('AMAZON', 'PRIME'))) == {'Shopping': 1.0}
+    assert not matcher.votes(('ZOMATO',))
+
+
+def test_suggestions_follow_history_and_updates():
+    rows = [
+        {'Date': '01/01/2026', 'Description': 'UPI/SWIGGY/1', 'Category': 'Food'},
+        {'Date': '02/01/2026', 'Description': 'UPI/SWIGGY/2', 'Category': 'Food'},
+        {'Date': '03/01/2026', 'Description': 'UPI/UBER/3', 'Category': 'Travel'},
+        {'Date': '04/01/2026', 'Description': 'UPI/UBER/4', 'Category': 'Travel'},
+    ]
+    model = Categorizer(rows)
+    food, travel, unknown = model.suggest_many(['UPI/SWIGGY/99 INSTAMART', 'UPI/UBER/7', 'ZZZ'])
+    assert food['category'] == 'Food'
+    assert travel['category'] == 'Travel'
+    assert unknown is None
+
+    model.update([dict(r, Category='Commute') for r in rows[2:]],
+                 replace_dates=['03/01/2026', '04/01/2026'])
+    assert model.suggest('UPI/UBER/7')['category'] == 'Commute'
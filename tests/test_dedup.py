@@ -0,0 +1,32 @@
+from dedup import FingerprintStore, fingerprint, split_duplicates
+
+ROW = {'Date': '01/02/2026', 'Description': 'UPI/SWIGGY/123', 'Withdrawal': '1,250.00',
+       'Deposit': '', 'Balance': '10000'}
+
+
+def test_fingerprint_normalizes_sheet_values():
+    from_sheet = {'Date': '1/2/2026', 'Description': ' upi/swiggy/123 ', 'Withdrawal': 1250,
+                  'Deposit': 0, 'Balance': 10000.0}
+    assert fingerprint(ROW) == fingerprint(from_sheet)
+    assert fingerprint(ROW) != fingerprint(dict(ROW, Balance='8750'))
+
+
+def test_split_duplicates():
+    other = dict(ROW, Balance='8750')
+    unique, duplicates = split_duplicates([ROW, other, dict(ROW)], known={fingerprint(other)})
+    assert unique == [ROW]
+    assert duplicates == [other, ROW]
+
+
+def test_store_sees_other_writers(tmp_path):
+    first = FingerprintStore(str(tmp_path))
+    second = FingerprintStore(str(tmp_path))
+    assert not first.has_account('acct')
+    assert first.known('acct') == set()
+
+    first.rebuild('acct', [ROW])
+    assert second.known('acct') == {fingerprint(ROW)}
+
+    other = dict(ROW, Balance='8750')
+    second.add('acct', [other])
+    assert first.known('acct') == {fingerprint(ROW), fingerprint(other)}
@@ -0,0 +1,52 @@
+from datetime import date
+
+from analytics_store import AnalyticsStore
+from budget_store import BudgetStore, month_index
+from forecast import MAX_HISTORY_MONTHS, forecast_month
+
+
+def txn(day, amount, category):
+    return {'Date': day, 'Description': 'UPI/SHOP/1', 'Withdrawal': amount, 'Deposit': 0, 'Category': category}
+
+
+def by_category(result):
+    return {row['category']: row for row in result['categories']}
+
+
+def test_run_rate_and_history_projection():
+    store = AnalyticsStore([
+        # March: 100 in the first half, 200 after day 15.
+        txn('05/03/2026', 100, 'Food'), txn('20/03/2026', 200, 'Food'),
+        # April so far: 150 by the 15th.
+        txn('10/04/2026', 150, 'Food'),
+    ])
+    budgets = BudgetStore([{'Category': 'Food', 'Month-Year': '01/2026', 'Budget': 300}])
+    result = forecast_month(store, budgets, month_index('04/2026'), as_of=date(2026, 4, 15), history=1)
+
+    assert result['month_year'] == '04/2026'
+    assert result['as_of_day'] == 15 and result['days_in_month'] == 30
+    assert result['history_months'] == 1
+    food = by_category(result)['Food']
+    assert food['spent'] == 150
+    assert food['run_rate_projection'] == 300
+    assert food['history_projection'] == 350
+    assert food['projected'] == 325
+    assert food['status'] == 'at_risk'
+
+
+def test_finished_month_projects_what_was_spent():
+    store = AnalyticsStore([txn('10/04/2026', 150, 'Food'), txn('11/04/2026', 50, 'Rent')])
+    budgets = BudgetStore([{'Category': 'Rent', 'Month-Year': '04/2026', 'Budget': 40},
+                           {'Category': 'Fuel', 'Month-Year': '04/2026', 'Budget': 10}])
+    rows = by_category(forecast_month(store, budgets, month_index('04/2026'), as_of=date(2026, 6, 1)))
+    assert rows['Food']['projected'] == 150 and rows['Food']['status'] is None
+    assert rows['Rent']['status'] == 'over_budget'
+    assert rows['Fuel']['spent'] == 0 and rows['Fuel']['status'] == 'on_track'
+
+
+def test_history_never_reaches_before_year_one():
+    store = AnalyticsStore([txn('10/02/0001', 10, 'Food')])
+    result = forecast_month(store, BudgetStore(), month_index('03/0001'),
+                            as_of=date(1, 3, 1), history=MAX_HISTORY_MONTHS)
+    assert result['history_months'] == 1
+    assert by_category(result)['Food']['history_projection'] == 10
@@ -0,0 +1,103 @@
+import copy
+import json
+import os
+
+import pytest
+
+from format_registry import FormatError, FormatRegistry, validate_formats
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORMAT = {
+    "name": "TEST",
+    "detection": {"text_present": ["TESTBANK"]},
+    "columns": [
+        {"name": "Date", "type": "date", "x_min": 0, "x_max": 50},
+        {"name": "Withdrawal", "type": "amount", "x_min": 50, "x_max": 100},
+    ],
+}
+
+
+def write(path, config):
+    with open(path, 'w') as f:
+        json.dump(config, f)
+
+
+def test_shipped_formats_are_valid():
+    with open(os.path.join(ROOT, 'bank_formats.json')) as f:
+        validate_formats(json.load(f))
+
+
+def test_valid_format():
+    validate_formats([FORMAT])
+
+
+@pytest.mark.parametrize("config", [
+    {"name": "not a list"},
+    ["not an object"],
+    [dict(FORMAT, name=["x"])],
+    [dict(FORMAT, name=" ")],
+    [FORMAT, FORMAT],
+    [dict(FORMAT, detection={"text_present": []})],
+    [dict(FORMAT, detection=["TESTBANK"])],
+    [dict(FORMAT, columns=[])],
+    [dict(FORMAT, columns=[{"name": "Date", "type": "text", "x_min": 0, "x_max": 50}])],
+    [dict(FORMAT, columns=[{"name": "Date", "type": "date", "x_min": 50, "x_max": 0}])],
+    [dict(FORMAT, columns=[{"name": "Amount", "type": "amount", "x_min": 0, "x_max": 50}])],
+    [dict(FORMAT, exclusions="Opening Balance")],
+    [dict(FORMAT, multiline_strategy="guess")],
+])
+def test_invalid_formats_raise_format_error(config):
+    with pytest.raises(FormatError):
+        validate_formats(config)
+
+
+def test_problems_are_all_reported():
+    with pytest.raises(FormatError) as e:
+        validate_formats([dict(FORMAT, columns=[]), dict(FORMAT, name="B", multiline_strategy="x")])
+    assert "'TEST': no columns" in str(e.value)
+    assert "'B': multiline_strategy" in str(e.value)
+
+
+def test_registry_keeps_previous_version_on_invalid_edit(tmp_path):
+    path = tmp_path / 'formats.json'
+    write(path, [FORMAT])
+    registry = FormatRegistry(str(path), check_interval=0)
+    version = registry.current().version
+    assert version is not None
+
+    write(path, [dict(FORMAT, name=["x"])])
+    formats = registry.current()
+    assert formats.version == version
+    assert formats.marker_index["TESTBANK"]["name"] == "TEST"
+    assert registry.last_error.startswith("Rejected")
+
+    renamed = copy.deepcopy(FORMAT)
+    renamed["name"] = "RENAMED"
+    write(path, [renamed, dict(FORMAT, name="OTHER", detection={"default": True})])
+    formats = registry.current()
+    assert formats.version != version
+    assert formats.default_format["name"] == "OTHER"
+    assert registry.last_error is None
+
+
+def test_registry_keeps_previous_version_when_file_is_unreadable(tmp_path, monkeypatch):
+    path = tmp_path / 'formats.json'
+    write(path, [FORMAT])
+    registry = FormatRegistry(str(path), check_interval=0)
+    version = registry.current().version
+
+    write(path, [dict(FORMAT, name="CHANGED")])
+
+    def unreadable(*args, **kwargs):
+        raise PermissionError("denied")
+    monkeypatch.setattr('builtins.open', unreadable)
+    assert registry.current().version == version
+    assert "not readable" in registry.last_error
+    monkeypatch.undo()
+
+    assert registry.current().config[0]["name"] == "CHANGED"
+
+    os.remove(path)
+    assert registry.current().config[0]["name"] == "CHANGED"
+    assert "not readable" in registry.last_error
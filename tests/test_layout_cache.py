@@ -0,0 +1,33 @@
+import pytest
+
+from layout_cache import DocumentLayout, LayoutCache, PageLayout
+
+
+def layout():
+    words = [
+        {'text': '01/03/2026', 'x0': 10.5, 'x1': 60.25, 'top': 100.0},
+        {'text': 'UPI/CAFÉ/123', 'x0': 70.0, 'x1': 180.75, 'top': 100.5},
+    ]
+    return DocumentLayout([PageLayout.from_words(words, 842.0), None, PageLayout.from_words([], 595.0)])
+
+
+def test_round_trip():
+    original = layout()
+    restored = DocumentLayout.from_bytes(original.to_bytes())
+    assert restored.page_count == 3
+    assert not restored.has_page(1) and not restored.is_complete()
+    assert restored.pages[0].height == 842.0
+    assert restored.pages[0].words() == original.pages[0].words()
+    assert restored.pages[2].words() == []
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        DocumentLayout.from_bytes(b'XXXX\0\0\0\0')
+
+
+def test_cache_get_put(tmp_path):
+    cache = LayoutCache(str(tmp_path))
+    assert cache.get('k') is None
+    cache.put('k', layout())
+    assert cache.get('k').pages[0].words() == layout().pages[0].words()
@@ -0,0 +1,49 @@
+from datetime import date
+
+from search_index import SearchIndex, parse_query
+
+
+def rows():
+    return [
+        {'Date': '01/03/2026', 'Description': 'UPI/SWIGGY/1', 'Withdrawal': 250, 'Deposit': 0, 'Category': 'Food'},
+        {'Date': '02/03/2026', 'Description': 'UPI/SWIGGY INSTAMART/2', 'Withdrawal': 900, 'Deposit': 0, 'Category': 'Groceries'},
+        {'Date': '03/03/2026', 'Description': 'NEFT SALARY', 'Withdrawal': 0, 'Deposit': 50000, 'Category': ''},
+        {'Date': '04/03/2026', 'Description': 'UPI/UBER/4', 'Withdrawal': 300, 'Deposit': 0, 'Category': 'Travel'},
+        {'Date': '05/03/2026', 'Description': 'UPI/SWIGGY/5', 'Withdrawal': 150, 'Deposit': 0, 'Category': 'food'},
+    ]
+
+
+def descriptions(hits):
+    return [row['Description'] for _, row in hits]
+
+
+def test_parse_query():
+    assert parse_query('swiggy insta*') == (['swiggy'], ['insta'])
+    assert parse_query('upi/swig*') == (['upi'], ['swig'])
+
+
+def test_text_and_prefix_queries_newest_first():
+    index = SearchIndex(rows())
+    assert descriptions(index.search('swiggy')) == ['UPI/SWIGGY/5', 'UPI/SWIGGY INSTAMART/2', 'UPI/SWIGGY/1']
+    assert descriptions(index.search('swiggy insta*')) == ['UPI/SWIGGY INSTAMART/2']
+    assert index.search('zomato') == []
+
+
+def test_filters():
+    index = SearchIndex(rows())
+    assert descriptions(index.search(category=' FOOD ')) == ['UPI/SWIGGY/5', 'UPI/SWIGGY/1']
+    assert descriptions(index.search('upi', category='food', min_amount=200)) == ['UPI/SWIGGY/1']
+    since = date(2026, 3, 2).toordinal()
+    assert descriptions(index.search(category='food', from_ordinal=since)) == ['UPI/SWIGGY/5']
+    assert descriptions(index.search(from_ordinal=since, to_ordinal=date(2026, 3, 3).toordinal())) == \
+        ['NEFT SALARY', 'UPI/SWIGGY INSTAMART/2']
+    assert descriptions(index.search(min_amount=10000)) == ['NEFT SALARY']
+
+
+def test_replaced_dates_drop_old_rows():
+    index = SearchIndex(rows())
+    index.update([{'Date': '01/03/2026', 'Description': 'UPI/ZOMATO/1', 'Withdrawal': 250, 'Category': 'Food'}],
+                 replace_dates=['01/03/2026'])
+    assert descriptions(index.search('zomato')) == ['UPI/ZOMATO/1']
+    assert descriptions(index.search(category='food')) == ['UPI/SWIGGY/5', 'UPI/ZOMATO/1']
+    assert len(index.rows()) == 5